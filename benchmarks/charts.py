@@ -0,0 +1,60 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Scatter plot and line chart rendering, one element per point vs batched.
+
+    PYTHONPATH=. python benchmarks/charts.py [points]
+"""
+
+import math
+import sys
+import time
+
+from htbuilder import circle, g, path, svg
+from htbuilder.charts import circles, path_d
+
+
+def per_element(xs, ys):
+    return svg(
+        g(circle(cx=x, cy=y, r=1) for x, y in zip(xs, ys)),
+        path(d="M" + " ".join(f"{x} {y}" for x, y in zip(xs, ys))),
+    )
+
+
+def batched(xs, ys, **kwargs):
+    return svg(g(circles(xs, ys, r=1, **kwargs)), path(d=path_d(xs, ys, **kwargs)))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    xs = [i * 1000 / n for i in range(n)]
+    ys = [500 + 400 * math.sin(x / 50) for x in xs]
+
+    print(f"{n} points")
+    cases = [
+        ("one element per point", lambda: per_element(xs, ys)),
+        ("batched", lambda: batched(xs, ys)),
+        ("batched, precision=1, tolerance=1", lambda: batched(xs, ys, precision=1, tolerance=1)),
+    ]
+
+    for name, build in cases:
+        start = time.perf_counter()
+        out = str(build())
+        elapsed = time.perf_counter() - start
+        print(f"  {name:36} {elapsed * 1000:8.1f} ms {len(out) / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+classes() before and after caching and deduplication, and ClassSet.
+
+    PYTHONPATH=. python benchmarks/classes.py [calls]
+"""
+
+import sys
+import timeit
+
+from htbuilder.utils import ClassSet, classes
+
+
+def classes_v1(*names, convert_underscores=True, **names_and_bools):
+    """classes() as it was before it got faster."""
+    if convert_underscores:
+        def clean(name):
+            return name.replace("_", "-")
+    else:
+        def clean(name):
+            return name
+
+    classes = [clean(name) for name in names]
+
+    for name, include in names_and_bools.items():
+        if include:
+            classes.append(clean(name))
+
+    return " ".join(classes)
+
+
+button = ClassSet("btn", "btn_base", is_primary=False, is_disabled=False, size_large=False)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    flags = [
+        dict(is_primary=i % 2 == 0, is_disabled=i % 7 == 0, size_large=i % 3 == 0)
+        for i in range(64)
+    ]
+
+    cases = [
+        ("classes_v1()", lambda f: classes_v1("btn", "btn_base", **f)),
+        ("classes()", lambda f: classes("btn", "btn_base", **f)),
+        ("ClassSet()", lambda f: button(**f)),
+    ]
+
+    print(f"{calls} calls")
+    for name, fn in cases:
+        # Check they all agree before timing them.
+        assert fn(flags[0]) == classes_v1("btn", "btn_base", **flags[0])
+
+        def run():
+            for i in range(calls):
+                fn(flags[i & 63])
+
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        print(f"  {name:14} {elapsed / calls * 1e9:7.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Node counts and render times of a component-heavy page, before and after
+htbuilder.optimize.
+
+    PYTHONPATH=. python benchmarks/optimize.py [rows]
+"""
+
+import gc
+import sys
+import time
+
+from htbuilder import HtmlElement, a, div, fragment, li, span, ul
+from htbuilder.optimize import normalize_on_insert, optimize
+
+RENDERS = 5
+
+
+def badge(n):
+    return fragment(" ", span(_class="badge")("#", n), None)
+
+
+def row(i):
+    return fragment(
+        li(_class="row")(
+            fragment(a(href=f"/items/{i}")("Item ", i), badge(i)),
+            "",
+            fragment(" (", i % 7, " comments)"),
+        ),
+        "\n",
+    )
+
+
+def page(rows):
+    return div(id="page")(ul(row(i) for i in range(rows)))
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+
+    while stack:
+        item = stack.pop()
+        count += 1
+        if isinstance(item, HtmlElement):
+            stack.extend(item._children)
+
+    return count
+
+
+def report(name, build, transform=None):
+    start = time.perf_counter()
+    tree = build()
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if transform is not None:
+        transform(tree)
+    optimize_time = time.perf_counter() - start
+
+    # Don't let garbage from building the tree count towards rendering it.
+    gc.collect()
+
+    start = time.perf_counter()
+    for _ in range(RENDERS):
+        str(tree)
+    render_time = (time.perf_counter() - start) / RENDERS
+
+    print(
+        f"  {name:26} {count_nodes(tree):7} nodes  build {build_time * 1000:6.0f} ms"
+        f"  optimize {optimize_time * 1000:5.0f} ms  render {render_time * 1000:6.1f} ms"
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{rows} rows")
+
+    def build():
+        return page(rows)
+
+    report("as built", build)
+    report("optimize()", build, optimize)
+    report("optimize(prerender=True)", build, lambda tree: optimize(tree, prerender=True))
+
+    def build_normalized():
+        with normalize_on_insert():
+            return page(rows)
+
+    report("normalize_on_insert()", build_normalized)
+
+
+if __name__ == "__main__":
+    main()
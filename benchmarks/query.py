@@ -0,0 +1,79 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cost of indexing a large tree with htbuilder.query, and of querying it again
+after small changes.
+
+    PYTHONPATH=. python benchmarks/query.py [items]
+"""
+
+import gc
+import sys
+import time
+
+from htbuilder import div, li, span, ul
+from htbuilder.query import select, select_one
+
+EDITS = 100
+
+
+def page(items):
+    return div(id="page")(
+        ul(id="list")(li(_class="item", id=f"i{i}")(span(i)) for i in range(items))
+    )
+
+
+def timed(fn):
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{items} items")
+
+    tree = page(items)
+    print(f"  str(tree)                  {timed(lambda: str(tree)) * 1000:8.1f} ms")
+    print(f"  first select_one()         {timed(lambda: select_one(tree, '#i5')) * 1000:8.1f} ms")
+    print(f"  select_one() again         {timed(lambda: select_one(tree, '#i5')) * 1000:8.3f} ms")
+
+    def edit_attrs():
+        for i in range(EDITS):
+            select_one(tree, f"#i{i}")(title="edited")
+
+    def append():
+        target = select_one(tree, "#list")
+        for i in range(EDITS):
+            target(li(_class="item new")(i))
+            select_one(tree, ".new")
+
+    print(f"  edit attribute, query      {timed(edit_attrs) / EDITS * 1000:8.3f} ms each")
+    print(f"  append child, query        {timed(append) / EDITS * 1000:8.3f} ms each")
+
+    copy = tree.clone()
+
+    def edit_clone():
+        for i in range(EDITS):
+            select_one(copy, f"#i{i}")(title="variant")
+
+    print(f"  first query on a clone     {timed(lambda: select_one(copy, '#i5')) * 1000:8.1f} ms")
+    print(f"  edit clone, query          {timed(edit_clone) / EDITS * 1000:8.3f} ms each")
+    print(f"  select('li') matches       {len(select(tree, 'li')):8}")
+
+
+if __name__ == "__main__":
+    main()
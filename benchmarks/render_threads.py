@@ -0,0 +1,88 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Rendering throughput with 1..N threads.
+
+Each thread builds and renders its own page, like a WSGI worker would. On
+regular CPython the GIL keeps this flat; on free-threaded builds (3.13t+) it
+should scale with the number of cores, since rendering takes no locks.
+
+    PYTHONPATH=. python benchmarks/render_threads.py [max_threads]
+"""
+
+import os
+import sys
+import threading
+import time
+
+from htbuilder import a, div, li, span, ul
+
+PAGES_PER_THREAD = 200
+
+
+def build_page(n):
+    return div(id="page", _class="container")(
+        ul(_class="items")(
+            li(_class="item", data_index=i)(
+                a(href=f"/items/{i}")(span(_class="label")(f"Item {i} of page {n}"))
+            )
+            for i in range(100)
+        )
+    )
+
+
+def worker(barrier):
+    barrier.wait()
+    for n in range(PAGES_PER_THREAD):
+        str(build_page(n))
+
+
+def run(num_threads):
+    barrier = threading.Barrier(num_threads + 1)
+    threads = [threading.Thread(target=worker, args=(barrier,)) for _ in range(num_threads)]
+
+    for t in threads:
+        t.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for t in threads:
+        t.join()
+
+    elapsed = time.perf_counter() - start
+    return num_threads * PAGES_PER_THREAD / elapsed
+
+
+def main():
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else min(os.cpu_count() or 1, 8)
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if is_gil_enabled else 'disabled'}")
+
+    base = None
+    threads = 1
+    while threads <= max_threads:
+        pages_per_second = run(threads)
+        base = base or pages_per_second
+        print(
+            f"{threads:3} threads: {pages_per_second:10.0f} pages/s"
+            f"  ({pages_per_second / base:.2f}x)"
+        )
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
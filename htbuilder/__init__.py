@@ -47,13 +47,21 @@ Example
 
 from __future__ import annotations
 
-from typing import Any, Iterable
+# Unlike threading, this is built in and already loaded, so it's free to import.
+import _thread
 
-from .funcs import func
-from .units import unit
-from .utils import classes, fonts, rule, styles
+# Unlike contextvars, this skips a module that only re-exports it.
+from _contextvars import ContextVar
 
-EMPTY_ELEMENTS = set(
+# Importing typing costs more than the rest of this package put together, so
+# only type checkers get to see it.
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any
+
+# Tag metadata is shared by every thread, so it's immutable.
+EMPTY_ELEMENTS = frozenset(
     [
         # https://developer.mozilla.org/en-US/docs/Glossary/Empty_element
         "area",
@@ -82,14 +90,47 @@ EMPTY_ELEMENTS = set(
 )
 
 
+# The _on_insert hook for elements built in the current context.
+_on_insert_var: ContextVar[Any] = ContextVar("htbuilder_on_insert", default=None)
+
+
 class HtmlElement:
-    _MEMBERS = {
-        "_cannot_have_attributes",
-        "_cannot_have_children",
-        "_tag",
-        "_attrs",
-        "_children",
-    }
+    _MEMBERS = frozenset(
+        {
+            "_cannot_have_attributes",
+            "_cannot_have_children",
+            "_tag",
+            "_attrs",
+            "_children",
+            "_observers",
+            "_index",
+            "_shared",
+            "_borrowed",
+            "_owned",
+            "_on_insert",
+        }
+    )
+
+    # Set by clone(). _shared means _attrs and _children may be used by
+    # another element too, so they're copied before the first change.
+    # _borrowed means the child elements also belong to another tree, except
+    # for those in _owned, which were swapped for copies of their own since.
+    _shared = False
+    _borrowed = False
+    _owned: Any = None
+
+    # Weak references to things (like query indexes) to tell when this
+    # element changes, as a tuple. Set through _add_observer() by whoever
+    # needs it, so plain elements don't pay for it.
+    _observers: Any = None
+
+    # The query index for the tree under this element. See htbuilder.query.
+    _index: Any = None
+
+    # Called as _on_insert(children, new_children) to add children, instead
+    # of just extending the list. Taken from _on_insert_var when the element
+    # is built. See htbuilder.optimize.normalize_on_insert().
+    _on_insert: Any = None
 
     def __init__(self, tag: str | None, *children: Any, **attrs: Any):
         """An HTML element."""
@@ -97,24 +138,46 @@ class HtmlElement:
         self._attrs = attrs or {}
         self._children = _to_flat_list(children) or []
 
+        on_insert = _on_insert_var.get()
+        if on_insert is not None:
+            self._on_insert = on_insert
+            flattened, self._children = self._children, []
+            on_insert(self._children, flattened)
+
         self._cannot_have_attributes = tag is None
         self._cannot_have_children = tag in EMPTY_ELEMENTS
 
     def __call__(self, *children: Any, **attrs: Any) -> HtmlElement:
+        if self._shared and (children or attrs):
+            self._unshare()
+
         if children:
             if self._cannot_have_children:
                 raise TypeError(f"{self._tag} cannot have children")
             flattened = _to_flat_list(children)
-            self._children += flattened
+            if self._on_insert is None:
+                self._children += flattened
+            else:
+                self._on_insert(self._children, flattened)
 
         if attrs:
             if self._cannot_have_attributes:
                 raise TypeError("Fragments cannot have attributes")
             self._attrs = {**self._attrs, **attrs}
 
+        if self._observers:
+            self._notify()
+
         return self
 
     def __getattr__(self, name: str) -> Any:
+        # Protocol lookups (pickle, copy) happen before __init__ runs, so they
+        # must not touch our own members.
+        if name in HtmlElement._MEMBERS or (
+            name.startswith("__") and name.endswith("__")
+        ):
+            raise AttributeError(name)
+
         if self._cannot_have_attributes:
             raise TypeError("Fragments cannot have attributes")
 
@@ -131,14 +194,26 @@ class HtmlElement:
             object.__setattr__(self, name, value)
             return
 
+        if self._shared:
+            self._unshare()
+
         self._attrs[name] = value
 
+        if self._observers:
+            self._notify()
+
     def __delattr__(self, name: str) -> None:
         if self._cannot_have_attributes:
             raise TypeError("Fragments cannot have attributes")
 
+        if self._shared:
+            self._unshare()
+
         del self._attrs[name]
 
+        if self._observers:
+            self._notify()
+
     def __getitem__(self, *children: Any):
         return self(children)
 
@@ -148,28 +223,161 @@ class HtmlElement:
         if self._tag is None:
             return children
 
-        tag = _clean_name(self._tag)
-        attrs = " ".join([f'{_clean_name(k)}="{v}"' for k, v in self._attrs.items()])
-
-        if self._cannot_have_children:
-            if self._attrs:
-                return f"<{tag} {attrs}/>"
-            else:
-                return f"<{tag}/>"
-        else:
-            if self._attrs:
-                return f"<{tag} {attrs}>{children}</{tag}>"
-            else:
-                return f"<{tag}>{children}</{tag}>"
+        start, end = _tag_strings(self)
+        return f"{start}{children}{end}"
 
     def _repr_html_(self) -> str:
         return str(self)
 
+    def clone(self) -> HtmlElement:
+        """Return a copy of this element, in O(1).
+
+        The copy shares its attributes, children and whole subtree with the
+        original, and each node is only really copied the first time it's
+        changed. Changes made to either element, or to descendants found in
+        it with htbuilder.query, don't show up in the other one. Only the
+        nodes on the way to the ones found are copied.
+
+        The exception is descendants you got hold of some other way, like
+        references kept from before cloning: those may still be part of both
+        trees, so find them again with htbuilder.query before changing them.
+        """
+        fields = dict(self.__dict__)
+        fields.pop("_observers", None)
+        fields.pop("_index", None)
+        fields.pop("_owned", None)
+        fields["_shared"] = True
+        fields["_borrowed"] = True
+
+        # Skip __init__: everything was already validated.
+        new = object.__new__(HtmlElement)
+        new.__dict__.update(fields)
+
+        # The children are now in both trees, including any this element had
+        # made its own.
+        object.__setattr__(self, "_shared", True)
+        object.__setattr__(self, "_borrowed", True)
+        object.__setattr__(self, "_owned", None)
+
+        if self._observers:
+            self._notify()
+
+        return new
+
+    def _unshare(self) -> None:
+        object.__setattr__(self, "_attrs", dict(self._attrs))
+        object.__setattr__(self, "_children", list(self._children))
+        object.__setattr__(self, "_shared", False)
+
+    def _own_children(self) -> list[Any]:
+        """Return _children, first swapping borrowed elements for clones.
+
+        Use this instead of _children when you're going to hand child
+        elements to someone who might change them.
+        """
+        if self._borrowed:
+            if self._shared:
+                self._unshare()
+
+            owned = self._owned or ()
+            self._children[:] = [
+                c.clone() if isinstance(c, HtmlElement) and c not in owned else c
+                for c in self._children
+            ]
+            object.__setattr__(self, "_borrowed", False)
+            object.__setattr__(self, "_owned", None)
+
+            if self._observers:
+                self._notify()
+
+        return self._children
+
+    def _own_child(self, i: int) -> Any:
+        """Return _children[i], first swapping it for a clone if borrowed.
+
+        Like _own_children(), for when only one child is going to be handed
+        out. Observers aren't told about the swap; that's up to the caller.
+        """
+        child = self._children[i]
+
+        if not self._borrowed or not isinstance(child, HtmlElement):
+            return child
+
+        owned = self._owned
+        if owned is None:
+            owned = set()
+            object.__setattr__(self, "_owned", owned)
+        elif child in owned:
+            return child
+
+        if self._shared:
+            self._unshare()
+
+        child = child.clone()
+        self._children[i] = child
+        owned.add(child)
+        return child
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Observers are tied to this process, and can't be pickled anyway.
+        state = dict(self.__dict__)
+        state.pop("_observers", None)
+        state.pop("_index", None)
+        return state
+
+    def _add_observer(self, ref: Any) -> None:
+        """Call ref()._invalidate(self) whenever this element changes.
+
+        `ref` is a weakref.ref, so observers don't keep elements alive or the
+        other way around.
+        """
+        _add_observers((self,), ref)
+
+    def _notify(self, skip: Any = None) -> None:
+        """Tell observers (except `skip`) that this element changed."""
+        for ref in self._observers:
+            observer = ref()
+            if observer is not None and observer is not skip:
+                observer._invalidate(self)
+
+
+_observers_lock = _thread.allocate_lock()
+
+
+def _add_observers(elements: Any, ref: Any) -> None:
+    """Like HtmlElement._add_observer(), for many elements at once."""
+    only_ref = (ref,)
+
+    # Trees can be shared by threads, and two of them adding observers at
+    # once must not lose one. Readers don't need the lock, since the tuple is
+    # replaced rather than changed.
+    with _observers_lock:
+        for element in elements:
+            observers = element._observers
+
+            if observers is None:
+                element.__dict__["_observers"] = only_ref
+            elif ref not in observers:
+                live = tuple([r for r in observers if r() is not None])
+                element.__dict__["_observers"] = live + only_ref
+
 
 class HtmlTag:
+    __slots__ = ("_tag",)
+
+    _tag: str | None
+
     def __init__(self, tag: str | None):
         """HTML element builder."""
-        self._tag = tag
+        object.__setattr__(self, "_tag", tag)
+
+    # Module-level builders like `div` are shared by everyone, so they can't
+    # be changed.
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("HtmlTag objects are read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("HtmlTag objects are read-only")
 
     def __call__(self, *args: Any, **kwargs: Any) -> HtmlElement:
         return HtmlElement(self._tag, *args, **kwargs)
@@ -181,35 +389,179 @@ class HtmlTag:
         return str(self())
 
 
+def _tag_strings(element: HtmlElement) -> tuple[str, str]:
+    """Return the opening and closing tags for a non-fragment element."""
+    tag = _clean_name(element._tag)  # type: ignore[arg-type]
+
+    if element._attrs:
+        attrs = " ".join([f'{_clean_name(k)}="{v}"' for k, v in element._attrs.items()])
+        start = f"<{tag} {attrs}"
+    else:
+        start = f"<{tag}"
+
+    if element._cannot_have_children:
+        return f"{start}/>", ""
+
+    return f"{start}>", f"</{tag}>"
+
+
+# Cleaned tag and attribute names. Plain dict reads and writes are atomic, so
+# threads share this without a lock: the worst a race can do is clean the same
+# name twice. It stops growing at _MAX_CLEAN_NAMES in case names are generated.
+_clean_names: dict[str, str] = {}
+_MAX_CLEAN_NAMES = 4096
+
+
 def _clean_name(name: str) -> str:
     """
     This allows you to use reserved words by prepending/appending underscores.
     For example, "_class" instead of "class".
     """
-    return name.strip("_").replace("_", "-")
+    cleaned = _clean_names.get(name)
+
+    if cleaned is None:
+        cleaned = name.strip("_").replace("_", "-")
+        if len(_clean_names) < _MAX_CLEAN_NAMES:
+            _clean_names[name] = cleaned
+
+    return cleaned
 
 
 def _to_flat_list(obj: Any) -> Any:
-    queue = [list(obj)]
+    # A stack of iterators rather than a queue of items, so long lists of
+    # children take linear time.
+    stack = [iter(obj)]
     out: list[Any] = []
 
-    while queue:
-        item = queue.pop(0)
+    while stack:
+        for item in stack[-1]:
+            # Strings are iterables so they need to be excluded separately.
+            # The __iter__ check is the same test as isinstance(item,
+            # collections.abc.Iterable), minus the cost of importing
+            # collections.abc.
+            if isinstance(item, str) or getattr(type(item), "__iter__", None) is None:
+                out.append(item)
+            else:
+                stack.append(iter(item))
+                break
+        else:
+            stack.pop()
 
-        # Strings are iterables so they need to be excluded separately.
-        if isinstance(item, str):
-            out.append(item)
+    return out
 
-        elif not isinstance(item, Iterable):
-            out.append(item)
 
-        else:
-            queue = list(item) + queue
+# Tags are left out so `from htbuilder import *` doesn't clobber names like
+# "time", "select" or "a".
+__all__ = [
+    "ClassSet",
+    "EMPTY_ELEMENTS",
+    "HtmlElement",
+    "HtmlTag",
+    "classes",
+    "fonts",
+    "func",
+    "rule",
+    "styles",
+    "unit",
+]
+
+# Helpers that live in submodules are only imported the first time they're used.
+_SUBMODULES = frozenset(
+    {
+        "binary",
+        "blobs",
+        "build",
+        "charts",
+        "components",
+        "funcs",
+        "hashing",
+        "optimize",
+        "parser",
+        "query",
+        "render",
+        "streaming",
+        "units",
+        "utils",
+        "window",
+    }
+)
 
-    return out
+_LAZY_ATTRS = {
+    "func": "funcs",
+    "unit": "units",
+    "classes": "utils",
+    "ClassSet": "utils",
+    "component": "components",
+    "fonts": "utils",
+    "rule": "utils",
+    "styles": "utils",
+}
+
+HTML_TAGS = (
+    # https://developer.mozilla.org/en-US/docs/Web/HTML/Element
+    "a", "abbr", "address", "area", "article", "aside", "audio", "b", "base",
+    "bdi", "bdo", "blockquote", "body", "br", "button", "canvas", "caption",
+    "cite", "code", "col", "colgroup", "data", "datalist", "dd", "del",
+    "details", "dfn", "dialog", "div", "dl", "dt", "em", "embed", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5",
+    "h6", "head", "header", "hgroup", "hr", "html", "i", "iframe", "img",
+    "input", "ins", "kbd", "keygen", "label", "legend", "li", "link", "main",
+    "map", "mark", "menu", "meta", "meter", "nav", "noscript", "object", "ol",
+    "optgroup", "option", "output", "p", "param", "picture", "pre",
+    "progress", "q", "rp", "rt", "ruby", "s", "samp", "script", "search",
+    "section", "select", "slot", "small", "source", "span", "strong",
+    "style", "sub", "summary", "sup", "table", "tbody", "td", "template",
+    "textarea", "tfoot", "th", "thead", "time", "title", "tr", "track", "u",
+    "ul", "var", "video", "wbr",
+)
+
+SVG_TAGS = (
+    # https://developer.mozilla.org/en-US/docs/Web/SVG/Element
+    # Tags are lowercased when built, so camelCase ones like "clipPath" are
+    # left to __getattr__.
+    "animate", "circle", "defs", "desc", "ellipse", "filter", "g", "image",
+    "line", "marker", "mask", "metadata", "path", "pattern", "polygon",
+    "polyline", "rect", "set", "stop", "svg", "switch", "symbol", "text",
+    "tspan", "use", "view",
+)
+
+
+def __getattr__(name: str) -> Any:
+    # Never pretend to have dunders like __all__ or __path__, or things like
+    # star-imports and pickle get very confused.
+    if name.startswith("__") and name.endswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Without this, `from htbuilder import utils` would find the "utils" tag
+    # below instead of importing the submodule.
+    if name in _SUBMODULES:
+        from importlib import import_module
+
+        return import_module(f".{name}", __name__)
+
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is not None:
+        from importlib import import_module
+
+        value = getattr(import_module(f".{module_name}", __name__), name)
+        globals()[name] = value
+        return value
+
+    return HtmlTag(name)
+
+
+def _install_tags() -> None:
+    import builtins
+
+    tags = {
+        tag: HtmlTag(tag)
+        for tag in HTML_TAGS + SVG_TAGS
+        # Tags like "input", "map" and "object" would shadow builtins used
+        # inside this module, so they keep going through __getattr__.
+        if not hasattr(builtins, tag)
+    }
+    tags["fragment"] = HtmlTag(None)
+    globals().update(tags)
 
 
-def __getattr__(tag: str) -> HtmlTag:
-    if tag == "fragment":
-    return HtmlTag(tag)
-        return HtmlTag(None)
+_install_tags()
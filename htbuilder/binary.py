@@ -0,0 +1,390 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact binary serialization for HtmlElement trees.
+
+Usage
+-----
+
+>>> from htbuilder import div, span
+>>> from htbuilder.binary import dumps, loads, render
+>>>
+>>> data = dumps(div(id="main")(span("hello")))
+>>> str(loads(data))
+'<div id="main"><span>hello</span></div>'
+>>> render(data)  # Same output, without building any HtmlElements.
+'<div id="main"><span>hello</span></div>'
+
+To share a cache between processes, write the bytes to a file and map it:
+
+>>> with open("cache.htb", "wb") as f:
+...     dump(tree, f)
+>>>
+>>> with load_mmap("cache.htb") as tree:
+...     html = tree.render()
+
+Format
+------
+
+Everything is a sequence of unsigned LEB128 varints and UTF-8 strings:
+
+    "HTB" version
+    string table: count, then (byte length, bytes) for each string
+    root node
+
+Tags, attribute names and attribute values go in the string table, so each
+distinct one is stored once. Nodes are a kind followed by its payload:
+
+    TEXT      byte length, bytes
+    ELEMENT   tag index, attribute count, (name index, value index)...,
+              child count, children...
+    VOID      tag index, attribute count, (name index, value index)...
+    FRAGMENT  child count, children...
+
+Children that are neither strings nor HtmlElements are stored as their
+str(), which is also how they would have been rendered.
+"""
+
+from __future__ import annotations
+
+import mmap
+import weakref
+
+from . import HtmlElement, _clean_name
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO, Iterator
+
+MAGIC = b"HTB\x01"
+
+_TEXT = 0
+_ELEMENT = 1
+_VOID = 2
+_FRAGMENT = 3
+
+
+def dumps(node: Any) -> bytes:
+    """Serialize an HtmlElement (or any child value) to bytes."""
+    strings: dict[str, int] = {}
+    body = bytearray()
+
+    def intern(s: str) -> None:
+        index = strings.get(s)
+        if index is None:
+            index = strings[s] = len(strings)
+        _write_varint(body, index)
+
+    stack = [node]
+
+    while stack:
+        item = stack.pop()
+
+        if not isinstance(item, HtmlElement):
+            encoded = str(item).encode("utf-8")
+            body.append(_TEXT)
+            _write_varint(body, len(encoded))
+            body += encoded
+            continue
+
+        if item._tag is None:
+            body.append(_FRAGMENT)
+        else:
+            body.append(_VOID if item._cannot_have_children else _ELEMENT)
+            intern(item._tag)
+            _write_varint(body, len(item._attrs))
+            for name, value in item._attrs.items():
+                intern(name)
+                intern(str(value))
+
+            if item._cannot_have_children:
+                continue
+
+        _write_varint(body, len(item._children))
+        stack.extend(reversed(item._children))
+
+    out = bytearray(MAGIC)
+    _write_varint(out, len(strings))
+    for s in strings:
+        encoded = s.encode("utf-8")
+        _write_varint(out, len(encoded))
+        out += encoded
+
+    out += body
+    return bytes(out)
+
+
+def dump(node: Any, fp: BinaryIO) -> None:
+    """Serialize an HtmlElement into a binary file object."""
+    fp.write(dumps(node))
+
+
+def loads(data: Any) -> Any:
+    """Rebuild an HtmlElement tree from bytes (or any buffer) made by dumps()."""
+    try:
+        return _loads(memoryview(data))
+    except IndexError:
+        raise ValueError("Truncated or corrupt htbuilder tree") from None
+
+
+def _loads(view: memoryview) -> Any:
+    strings, pos = _read_string_table(view)
+    root: list[Any] = []
+    new_element = object.__new__
+
+    # Each entry is (children list to fill, how many are still missing).
+    stack: list[list[Any]] = [[root, 1]]
+
+    while stack:
+        frame = stack[-1]
+        if frame[1] == 0:
+            stack.pop()
+            continue
+        frame[1] -= 1
+
+        kind = view[pos]
+        pos += 1
+
+        if kind == _TEXT:
+            text, pos = _read_bytes(view, pos)
+            frame[0].append(str(text, "utf-8"))
+            continue
+
+        # Skip __init__ and __setattr__: everything was validated when the
+        # tree was first built.
+        element = new_element(HtmlElement)
+        fields = element.__dict__
+        fields["_children"] = []
+
+        if kind == _FRAGMENT:
+            fields["_tag"] = None
+            fields["_attrs"] = {}
+            fields["_cannot_have_attributes"] = True
+            fields["_cannot_have_children"] = False
+        else:
+            index, pos = _read_varint(view, pos)
+            fields["_tag"] = strings[index]
+            fields["_cannot_have_attributes"] = False
+            # Keep the flag as it was, even for tags like "IMG".
+            fields["_cannot_have_children"] = kind == _VOID
+
+            count, pos = _read_varint(view, pos)
+            attrs = {}
+            for _ in range(count):
+                name, pos = _read_varint(view, pos)
+                value, pos = _read_varint(view, pos)
+                attrs[strings[name]] = strings[value]
+            fields["_attrs"] = attrs
+
+        frame[0].append(element)
+
+        if kind != _VOID:
+            count, pos = _read_varint(view, pos)
+            stack.append([element._children, count])
+
+    return root[0]
+
+
+def load(fp: BinaryIO) -> Any:
+    """Rebuild an HtmlElement tree from a binary file object."""
+    return loads(fp.read())
+
+
+def iter_render(data: Any) -> Iterator[bytes | memoryview]:
+    """Render serialized bytes to UTF-8 HTML chunks, without building elements.
+
+    Text chunks are memoryview slices of `data`, so nothing is copied until
+    they're written somewhere. While those slices (or an unfinished iterator)
+    are alive, `data` stays exported and can't be resized or closed.
+    """
+    try:
+        yield from _iter_render(memoryview(data))
+    except IndexError:
+        raise ValueError("Truncated or corrupt htbuilder tree") from None
+
+
+def _iter_render(view: memoryview) -> Iterator[bytes | memoryview]:
+    strings, pos = _read_string_table(view)
+    names: dict[int, bytes] = {}
+    values: dict[int, bytes] = {}
+
+    def name_at(index: int) -> bytes:
+        name = names.get(index)
+        if name is None:
+            name = names[index] = _clean_name(strings[index]).encode("utf-8")
+        return name
+
+    def value_at(index: int) -> bytes:
+        value = values.get(index)
+        if value is None:
+            value = values[index] = strings[index].encode("utf-8")
+        return value
+
+    # Each entry is [children still to render, closing tag].
+    stack: list[list[Any]] = [[1, b""]]
+
+    while stack:
+        frame = stack[-1]
+        if frame[0] == 0:
+            stack.pop()
+            if frame[1]:
+                yield frame[1]
+            continue
+        frame[0] -= 1
+
+        kind = view[pos]
+        pos += 1
+
+        if kind == _TEXT:
+            text, pos = _read_bytes(view, pos)
+            yield text
+            continue
+
+        if kind == _FRAGMENT:
+            count, pos = _read_varint(view, pos)
+            stack.append([count, b""])
+            continue
+
+        index, pos = _read_varint(view, pos)
+        tag = name_at(index)
+        parts = [b"<", tag]
+
+        count, pos = _read_varint(view, pos)
+        for _ in range(count):
+            name, pos = _read_varint(view, pos)
+            value, pos = _read_varint(view, pos)
+            parts += (b" ", name_at(name), b'="', value_at(value), b'"')
+
+        if kind == _VOID:
+            parts.append(b"/>")
+            yield b"".join(parts)
+            continue
+
+        parts.append(b">")
+        yield b"".join(parts)
+
+        count, pos = _read_varint(view, pos)
+        stack.append([count, b"</" + tag + b">"])
+
+
+def render(data: Any) -> str:
+    """Render serialized bytes straight to an HTML string."""
+    return b"".join(iter_render(data)).decode("utf-8")
+
+
+class MappedTree:
+    def __init__(self, path: str):
+        """A serialized tree, memory-mapped from a file made with dump().
+
+        Rendering reads straight from the mapped pages, so many processes can
+        share one copy of the cache. The chunks it yields are bytes copies,
+        so they stay valid after close(), which also stops any renders that
+        are still in progress.
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._renders: weakref.WeakSet[Any] = weakref.WeakSet()
+
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a serialized htbuilder tree")
+
+    def iter_render(self) -> Iterator[bytes]:
+        chunks = self._iter_copies()
+        self._renders.add(chunks)
+        return chunks
+
+    def render(self) -> str:
+        return render(self._mmap)
+
+    def to_element(self) -> Any:
+        return loads(self._mmap)
+
+    def close(self) -> None:
+        # Unfinished renders hold memoryviews into the map, which would make
+        # closing it fail.
+        for chunks in list(self._renders):
+            chunks.close()
+
+        self._mmap.close()
+
+    def _iter_copies(self) -> Iterator[bytes]:
+        for chunk in iter_render(self._mmap):
+            yield bytes(chunk)
+
+    def __enter__(self) -> MappedTree:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+def load_mmap(path: str) -> MappedTree:
+    """Memory-map a file made with dump(). Close it (or use `with`) when done."""
+    return MappedTree(path)
+
+
+def _read_string_table(view: memoryview) -> tuple[list[str], int]:
+    if view[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a serialized htbuilder tree")
+
+    count, pos = _read_varint(view, len(MAGIC))
+    strings = []
+
+    for _ in range(count):
+        text, pos = _read_bytes(view, pos)
+        strings.append(str(text, "utf-8"))
+
+    return strings, pos
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_bytes(view: memoryview, pos: int) -> tuple[memoryview, int]:
+    """Read a length-prefixed byte string."""
+    length, pos = _read_varint(view, pos)
+    end = pos + length
+
+    # Slicing past the end doesn't raise, so check by hand.
+    if end > len(view):
+        raise IndexError("byte string runs past the end of the data")
+
+    return view[pos:end], end
+
+
+def _read_varint(view: memoryview, pos: int) -> tuple[int, int]:
+    byte = view[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+
+    value = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
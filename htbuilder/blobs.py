@@ -0,0 +1,212 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Children that hold large text without loading it into memory.
+
+Usage
+-----
+
+>>> from htbuilder import pre, script
+>>> from htbuilder.blobs import BufferText, FileText
+>>> from htbuilder.render import render_to_file
+>>>
+>>> page = html(body(
+...     script(type="application/json")(FileText("payload.json", escape="script")),
+...     pre(FileText("server.log", escape=True)),
+... ))
+>>>
+>>> render_to_file(page, "page.html")
+
+With render_to_file(), the file's bytes are copied straight to the output
+when both use the same encoding (escaping them on the way if needed), so the
+blob never exists as a str. iter_render() and streaming.stream() decode them
+in chunks instead. Either way memory use stays flat no matter how big the
+blob is.
+
+BufferText does the same for anything that supports the buffer protocol,
+like bytes, bytearray or mmap.mmap objects.
+
+Escaping
+--------
+
+* escape=False: output the text as it is.
+* escape=True: replace &, < and > with character references, which is what
+  text inside elements like <pre> needs.
+* escape="script": replace "</" with "<\\/", so the text can't close the
+  <script> or <style> element it's in. This is the usual way to inline JSON,
+  where "<\\/" means the same as "</".
+
+Note that str() on a blob (or on an element containing it) still reads the
+whole thing into memory.
+"""
+
+from __future__ import annotations
+
+import abc
+import codecs
+
+from .render import DEFAULT_BUFFER_SIZE
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Iterator
+
+_HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+
+# Encodings where every ASCII character is always a single byte, so escaping
+# can be done on the raw bytes.
+_ASCII_SAFE_ENCODINGS = frozenset({"utf-8", "ascii", "latin-1", "iso8859-1", "cp1252"})
+
+
+class _Blob(abc.ABC):
+    def __init__(
+        self,
+        encoding: str = "utf-8",
+        escape: bool | str = False,
+        chunk_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        if escape not in (False, True, "script"):
+            raise ValueError(f"Unknown escape mode {escape!r}")
+
+        self.encoding = codecs.lookup(encoding).name
+        self.escape = escape
+        self.chunk_size = chunk_size
+
+    @abc.abstractmethod
+    def _iter_raw(self) -> Iterator[bytes]:
+        """Yield the raw, undecoded data in chunks."""
+
+    def __html_chunks__(self) -> Iterator[str]:
+        """Yield the (escaped) text in chunks."""
+        return _escape_chunks(self._iter_text(), self.escape, "")
+
+    def __html_bytes__(self, encoding: str) -> Iterator[bytes] | None:
+        """Yield the (escaped) text as `encoding` bytes, or return None if
+        that can't be done without decoding it."""
+        if codecs.lookup(encoding).name != self.encoding:
+            return None
+        if self.escape and self.encoding not in _ASCII_SAFE_ENCODINGS:
+            return None
+        return _escape_chunks(self._iter_raw(), self.escape, b"")
+
+    def __str__(self) -> str:
+        return "".join(self.__html_chunks__())
+
+    def _iter_text(self) -> Iterator[str]:
+        # Characters may be split across chunks, so decode incrementally.
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+
+        for data in self._iter_raw():
+            yield decoder.decode(data)
+
+        yield decoder.decode(b"", final=True)
+
+
+class FileText(_Blob):
+    def __init__(
+        self,
+        path: Any,
+        encoding: str = "utf-8",
+        escape: bool | str = False,
+        chunk_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        """Text read from a file every time it's rendered.
+
+        Parameters
+        ----------
+        path : str or path-like
+            The file. It's opened when rendering starts.
+        encoding : str
+            The file's encoding.
+        escape : bool or "script"
+            How to escape the text. See the module docs.
+        chunk_size : int
+            How many bytes to read at a time.
+
+        """
+        super().__init__(encoding, escape, chunk_size)
+        self.path = path
+
+    def _iter_raw(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    return
+                yield data
+
+
+class BufferText(_Blob):
+    def __init__(
+        self,
+        buffer: Any,
+        encoding: str = "utf-8",
+        escape: bool | str = False,
+        chunk_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        """Text held in a bytes-like object, like an mmap.mmap.
+
+        Takes the same arguments as FileText, with a buffer instead of a path.
+        The buffer must stay open while the blob is being rendered.
+        """
+        super().__init__(encoding, escape, chunk_size)
+        self.buffer = buffer
+
+    def _iter_raw(self) -> Iterator[bytes]:
+        with memoryview(self.buffer) as view:
+            view = view.cast("B")
+            for start in range(0, len(view), self.chunk_size):
+                # Copy each chunk, so no view outlives the buffer.
+                yield view[start : start + self.chunk_size].tobytes()
+
+
+def _escape_chunks(chunks: Any, escape: bool | str, empty: Any) -> Iterator[Any]:
+    """Escape str or bytes chunks. `empty` is "" or b"" to match them."""
+    if not escape:
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+        return
+
+    if escape == "script":
+        lt = "<" if isinstance(empty, str) else b"<"
+        # A "<" at the end of a chunk may be followed by "/" in the next one,
+        # so it's held back.
+        carry = empty
+        for chunk in chunks:
+            chunk = _replace(carry + chunk, (("</", "<\\/"),))
+            carry = empty
+            if chunk.endswith(lt):
+                chunk, carry = chunk[:-1], lt
+            if chunk:
+                yield chunk
+        if carry:
+            yield carry
+        return
+
+    for chunk in chunks:
+        if chunk:
+            yield _replace(chunk, _HTML_ESCAPES)
+
+
+def _replace(chunk: Any, pairs: Any) -> Any:
+    if isinstance(chunk, bytes):
+        for old, new in pairs:
+            chunk = chunk.replace(old.encode("ascii"), new.encode("ascii"))
+    else:
+        for old, new in pairs:
+            chunk = chunk.replace(old, new)
+    return chunk
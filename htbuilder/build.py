@@ -0,0 +1,268 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Render many static pages at once, only rewriting the ones that changed.
+
+Usage
+-----
+
+In a module of yours (say, `mysite/pages.py`):
+
+>>> from htbuilder import body, h1, html
+>>>
+>>> def home():
+...     return html(body(h1("Welcome!")))
+>>>
+>>> def post(slug):
+...     ...
+>>>
+>>> PAGES = {
+...     "index.html": home,
+...     # Pages can declare a dependency key. If it's the same as in the last
+...     # build, the page isn't even built.
+...     "posts/hello.html": (functools.partial(post, "hello"), "hello@v3"),
+... }
+
+Then either call build() from Python:
+
+>>> from htbuilder.build import build
+>>> build(PAGES, "public/")
+
+...or use the command line:
+
+    python -m htbuilder.build mysite.pages:PAGES public/
+
+Pages are built in a process pool, so page functions must be picklable
+(module-level functions or functools.partial objects of them). Pages without
+a dependency key are always built, but only rendered and written if their
+tree's fingerprint (see htbuilder.hashing) changed since the last build.
+What was built is remembered in a `.htbuilder-build.json` file in the output
+directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .hashing import fingerprint
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Mapping
+
+STATE_FILE = ".htbuilder-build.json"
+
+# How many pages each worker gets at a time, to keep IPC overhead down.
+_BATCH_SIZE = 32
+
+BuildResult = namedtuple("BuildResult", ["written", "unchanged", "skipped"])
+
+
+def build(
+    pages: Mapping[str, Any],
+    out_dir: str = ".",
+    workers: int | None = None,
+    force: bool = False,
+    encoding: str = "utf-8",
+) -> BuildResult:
+    """Render pages into files under `out_dir`.
+
+    Parameters
+    ----------
+    pages : mapping
+        Maps output paths (relative to `out_dir`) to either a callable that
+        returns the page's tree, or a (callable, dependency key) tuple. The
+        key can be anything JSON-serializable.
+    out_dir : str
+        Where to write the pages.
+    workers : int or None
+        Number of worker processes. None means one per CPU, and 0 builds
+        everything in this process.
+    force : bool
+        Rebuild and rewrite every page, ignoring the previous build.
+    encoding : str
+        Encoding for the written files.
+
+    Returns
+    -------
+    BuildResult
+        Lists of the paths that were written, that were built but found
+        unchanged, and that were skipped thanks to their dependency key.
+
+    """
+    state_path = os.path.join(out_dir, STATE_FILE)
+    old_state = {} if force else _load_state(state_path)
+    new_state: dict[str, dict[str, Any]] = {}
+
+    skipped = []
+    tasks = []
+
+    for path, page in pages.items():
+        fn, dep = page if isinstance(page, tuple) else (page, None)
+        dep = None if dep is None else json.dumps(dep, sort_keys=True)
+        out_path = os.path.join(out_dir, path)
+        previous = old_state.get(path)
+
+        if previous is not None:
+            # Until the page is rebuilt, what's on disk is still the old build.
+            new_state[path] = previous
+
+            if dep is not None and previous.get("dep") == dep and os.path.exists(out_path):
+                skipped.append(path)
+                continue
+
+        old_digest = previous and previous.get("hash")
+        tasks.append((path, out_path, fn, dep, old_digest, encoding))
+
+    batches = [tasks[i : i + _BATCH_SIZE] for i in range(0, len(tasks), _BATCH_SIZE)]
+    written: list[str] = []
+    unchanged: list[str] = []
+    error = None
+
+    def record(batch_result: tuple[list[tuple[Any, ...]], BaseException | None]) -> None:
+        nonlocal error
+        done, batch_error = batch_result
+
+        for path, dep, digest, was_written in done:
+            new_state[path] = {"dep": dep, "hash": digest}
+            (written if was_written else unchanged).append(path)
+
+        if batch_error is not None and error is None:
+            error = batch_error
+
+    # Whatever happens, remember the pages that were written, so the next
+    # build doesn't start from scratch.
+    try:
+        if workers == 0 or len(batches) <= 1:
+            for batch in batches:
+                record(_build_batch(batch))
+                if error is not None:
+                    break
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_build_batch, batch) for batch in batches]
+
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+
+                    record(future.result())
+
+                    if error is not None:
+                        # Stop, but keep what the other workers finish.
+                        for pending in futures:
+                            pending.cancel()
+    finally:
+        _save_state(state_path, new_state)
+
+    if error is not None:
+        raise error
+
+    return BuildResult(written, unchanged, skipped)
+
+
+def _build_batch(
+    tasks: list[tuple[Any, ...]],
+) -> tuple[list[tuple[Any, ...]], BaseException | None]:
+    """Build pages, returning what was done and the error that stopped it."""
+    out = []
+
+    try:
+        for path, out_path, fn, dep, old_digest, encoding in tasks:
+            tree = fn()
+            digest = fingerprint(tree)
+
+            if digest == old_digest and os.path.exists(out_path):
+                out.append((path, dep, digest, False))
+                continue
+
+            data = str(tree).encode(encoding)
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+            # One write per page.
+            with open(out_path, "wb") as f:
+                f.write(data)
+
+            out.append((path, dep, digest, True))
+
+    except Exception as e:
+        return out, e
+
+    return out, None
+
+
+def _load_state(path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: dict[str, dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def _load_pages(spec: str) -> Mapping[str, Any]:
+    from importlib import import_module
+
+    module_name, _, attr = spec.partition(":")
+    pages = getattr(import_module(module_name), attr or "PAGES")
+
+    if callable(pages):
+        pages = pages()
+
+    return pages
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m htbuilder.build",
+        description="Render htbuilder pages to static files.",
+    )
+    parser.add_argument(
+        "pages",
+        help="module:attribute holding the pages mapping, or a function "
+        "returning it (attribute defaults to PAGES)",
+    )
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("-f", "--force", action="store_true", help="rebuild everything")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    result = build(_load_pages(args.pages), args.out_dir, workers=args.workers, force=args.force)
+
+    print(
+        f"{len(result.written)} written, {len(result.unchanged)} unchanged, "
+        f"{len(result.skipped)} skipped"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Build SVG shapes for many data points at once.
+
+Usage
+-----
+
+>>> from htbuilder import g, path, polyline, svg
+>>> from htbuilder.charts import circles, path_d, points
+>>>
+>>> xs = list(range(100000))
+>>> ys = [x * x for x in xs]
+>>>
+>>> chart = svg(viewBox="0 0 100 100")(
+...     path(d=path_d(xs, ys, precision=1, tolerance=0.5), fill="none"),
+...     polyline(points=points([(0, 0), (10, 20), (30, 5)])),
+...     g(fill="red")(circles(xs, ys, r=1.5, tolerance=1)),
+... )
+
+Coordinates can be a sequence of (x, y) pairs, or separate sequences of x's
+and y's. NumPy arrays (of shape (n, 2), or 1-D for separate x's and y's) work
+too, without this module importing NumPy.
+
+Numbers are written with at most `precision` decimals and without trailing
+zeros. Pass precision=None to write them exactly. Points can be decimated
+with `tolerance`, in the same units as the coordinates:
+
+* path_d() and points() skip points closer than `tolerance` to the last point
+  they kept. The first and last points are always kept.
+* circles() keeps one circle per `tolerance`-sized grid cell.
+"""
+
+from __future__ import annotations
+
+import re
+
+from . import _clean_name
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Sequence
+
+# The zeros (and maybe the dot) that "%.2f" leaves at the end of numbers, as
+# in "2.00" and "1.50". Two simple substitutions beat one with a callback.
+_ZERO_DECIMALS = re.compile(r"\.0+(?=[\s,\"Z]|$)")
+_TRAILING_ZEROS = re.compile(r"(\.\d*?[1-9])0+(?=[\s,\"Z]|$)")
+
+# Stands for the extra attributes in circle templates, since they must not be
+# touched by the zero stripping nor by %-formatting.
+_ATTRS = "\0"
+
+
+def path_d(
+    xs: Any,
+    ys: Any = None,
+    precision: int | None = 2,
+    tolerance: float | None = None,
+    closed: bool = False,
+) -> str:
+    """Return a path "d" attribute drawing a line through the points."""
+    flat = _flatten(xs, ys, tolerance, _decimate_line)
+    if not flat:
+        return ""
+
+    number = _number_format(precision)
+    template = f"M{number} {number}" + f" {number} {number}" * (len(flat) // 2 - 1)
+    if closed:
+        template += "Z"
+
+    return _format(template, flat)
+
+
+def points(
+    xs: Any,
+    ys: Any = None,
+    precision: int | None = 2,
+    tolerance: float | None = None,
+) -> str:
+    """Return a polyline/polygon "points" attribute."""
+    flat = _flatten(xs, ys, tolerance, _decimate_line)
+    if not flat:
+        return ""
+
+    number = _number_format(precision)
+    template = " ".join([f"{number},{number}"] * (len(flat) // 2))
+
+    return _format(template, flat)
+
+
+def circles(
+    xs: Any,
+    ys: Any = None,
+    r: float | Sequence[float] = 1,
+    precision: int | None = 2,
+    tolerance: float | None = None,
+    **attrs: Any,
+) -> str:
+    """Return the markup for one <circle> per point.
+
+    `r` can be a single radius or one per point. Other keyword arguments are
+    added as attributes to every circle, with the usual name cleaning. To
+    style all circles at once it's cheaper to set attributes on an enclosing
+    <g> instead.
+    """
+    radii = r.tolist() if hasattr(r, "tolist") else r
+    per_point = not isinstance(radii, (int, float))
+
+    if not isinstance(radii, (int, float)):
+        if ys is None:
+            pairs = _to_list(xs)
+            pairs = [(x, y, radius) for (x, y), radius in zip(pairs, radii)]
+        else:
+            pairs = list(zip(_to_list(xs), _to_list(ys), radii))
+        if tolerance:
+            pairs = _decimate_grid(pairs, tolerance)
+        flat = [c for p in pairs for c in p]
+    else:
+        flat = _flatten(xs, ys, tolerance, _decimate_grid)
+
+    if not flat:
+        return ""
+
+    number = _number_format(precision)
+    if per_point:
+        template = f'<circle cx="{number}" cy="{number}" r="{number}"{_ATTRS}/>'
+        count = len(flat) // 3
+    else:
+        radius = _format(number, [radii])
+        template = f'<circle cx="{number}" cy="{number}" r="{radius}"{_ATTRS}/>'
+        count = len(flat) // 2
+
+    out = _format(template * count, flat)
+
+    if attrs:
+        extra = "".join([f' {_clean_name(k)}="{v}"' for k, v in attrs.items()])
+        return out.replace(_ATTRS, extra)
+
+    return out.replace(_ATTRS, "")
+
+
+def _number_format(precision: int | None) -> str:
+    return "%r" if precision is None else f"%.{precision}f"
+
+
+def _format(template: str, flat: list[Any]) -> str:
+    """Fill in all numbers with a single %-operation, then tidy them up."""
+    out = template % tuple(flat)
+
+    # Even exact numbers may have a pointless ".0", as in repr(2.0).
+    return _TRAILING_ZEROS.sub(r"\1", _ZERO_DECIMALS.sub("", out))
+
+
+def _to_list(values: Any) -> list[Any]:
+    # Works for NumPy arrays, without having to import NumPy.
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return values if isinstance(values, list) else list(values)
+
+
+def _flatten(xs: Any, ys: Any, tolerance: float | None, decimate: Any) -> list[Any]:
+    """Return the coordinates as a flat [x0, y0, x1, y1, ...] list."""
+    if not tolerance:
+        # Fast paths that don't create a tuple per point.
+        if ys is not None:
+            x_list = _to_list(xs)
+            y_list = _to_list(ys)
+            n = min(len(x_list), len(y_list))
+            flat = [0.0] * (2 * n)
+            flat[0::2] = x_list[:n]
+            flat[1::2] = y_list[:n]
+            return flat
+
+        if hasattr(xs, "ravel"):
+            return xs.ravel().tolist()
+
+        return [c for p in xs for c in p]
+
+    if ys is None:
+        pairs = [tuple(p) for p in _to_list(xs)]
+    else:
+        pairs = list(zip(_to_list(xs), _to_list(ys)))
+
+    return [c for p in decimate(pairs, tolerance) for c in p]
+
+
+def _decimate_line(pairs: list[Any], tolerance: float) -> list[Any]:
+    """Drop points closer than `tolerance` to the previous kept point."""
+    if len(pairs) < 3:
+        return pairs
+
+    limit = tolerance * tolerance
+    last_x, last_y = pairs[0][:2]
+    out = [pairs[0]]
+
+    for p in pairs[1:-1]:
+        dx = p[0] - last_x
+        dy = p[1] - last_y
+        if dx * dx + dy * dy >= limit:
+            out.append(p)
+            last_x, last_y = p[0], p[1]
+
+    out.append(pairs[-1])
+    return out
+
+
+def _decimate_grid(pairs: list[Any], tolerance: float) -> list[Any]:
+    """Keep the first point in each tolerance-sized grid cell."""
+    seen = set()
+    out = []
+
+    for p in pairs:
+        cell = (p[0] // tolerance, p[1] // tolerance)
+        if cell not in seen:
+            seen.add(cell)
+            out.append(p)
+
+    return out
@@ -0,0 +1,200 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Memoized functional components.
+
+Usage
+-----
+
+>>> from htbuilder import component, img, span
+>>>
+>>> @component(maxsize=1000)
+... def user_chip(name, avatar_url):
+...     return span(_class="chip")(img(src=avatar_url), name)
+>>>
+>>> user_chip("Ada", "/ada.png")  # Built and rendered.
+>>> user_chip("Ada", "/ada.png")  # Straight from the cache.
+>>> user_chip.cache_info()
+CacheInfo(hits=1, misses=1, maxsize=1000, currsize=1)
+
+Cached components return their output already rendered, as a `Rendered`
+string, so you can use them as children anywhere and they're never rebuilt or
+walked again. htbuilder.render.iter_render() (and everything built on it)
+emits them as-is; plain str(parent) still copies each one once through str().
+Since the output is shared, it can't be modified after the fact: pass
+everything that changes as arguments instead.
+
+Note that `htbuilder.component` is this decorator, so a `<component>` tag has
+to be built with `HtmlElement("component")`.
+
+Calls with unhashable arguments (like lists) still work, but skip the cache.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .render import iter_render
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+# Sentinel for cache misses, since None is a valid component output.
+_MISSING = object()
+
+# Separates positional from keyword arguments in cache keys.
+_KWARGS_MARK = object()
+
+
+class Rendered(str):
+    """HTML that was already rendered, so it gets output as-is."""
+
+    __slots__ = ()
+
+    def _repr_html_(self) -> str:
+        return str(self)
+
+
+class CacheInfo(namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])):
+    __slots__ = ()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedComponent:
+    def __init__(self, fn: Callable[..., Any], maxsize: int | None, ttl: float | None):
+        """A component function whose rendered output is cached. See component()."""
+        functools.update_wrapper(self, fn)
+        self._fn = fn
+        self._maxsize = maxsize
+        self._ttl = ttl
+
+        # Maps argument keys to (expiry time, rendered output). Each component
+        # has its own lock, and only holds it for bookkeeping, never while
+        # rendering.
+        self._cache: OrderedDict[Any, tuple[float, Rendered]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Rendered:
+        key = _make_key(args, kwargs)
+
+        try:
+            hash(key)
+        except TypeError:
+            with self._lock:
+                self._misses += 1
+            return self._render(args, kwargs)
+
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key, _MISSING)
+
+            if entry is not _MISSING and entry[0] > now:  # type: ignore[index]
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return entry[1]  # type: ignore[index]
+
+            self._misses += 1
+
+        out = self._render(args, kwargs)
+        expires = now + self._ttl if self._ttl is not None else float("inf")
+
+        with self._lock:
+            self._cache[key] = (expires, out)
+            self._cache.move_to_end(key)
+
+            if self._maxsize is not None:
+                while len(self._cache) > self._maxsize:
+                    self._cache.popitem(last=False)
+
+        return out
+
+    def uncached(self, *args: Any, **kwargs: Any) -> Any:
+        """Call the original function, returning a fresh, mutable tree."""
+        return self._fn(*args, **kwargs)
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._cache))
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def _render(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Rendered:
+        return Rendered("".join(iter_render(self._fn(*args, **kwargs))))
+
+
+def _make_key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> tuple[Any, ...]:
+    """Return a cache key for a call, like functools' typed lru_cache does.
+
+    Output depends on str(arg), so values that are equal but of different
+    types, like 1 and True, must get different keys.
+    """
+    key: list[Any] = [_typed(a) for a in args]
+
+    if kwargs:
+        key.append(_KWARGS_MARK)
+        for name in sorted(kwargs):
+            key.append(name)
+            key.append(_typed(kwargs[name]))
+
+    return tuple(key)
+
+
+def _typed(value: Any) -> Any:
+    if type(value) is tuple:
+        return (tuple, tuple([_typed(v) for v in value]))
+    return (type(value), value)
+
+
+def component(
+    fn: Callable[..., Any] | None = None,
+    *,
+    maxsize: int | None = 256,
+    ttl: float | None = None,
+) -> Any:
+    """Decorator that caches a component's rendered output by its arguments.
+
+    Parameters
+    ----------
+    maxsize : int or None
+        How many distinct argument combinations to keep. The least recently
+        used ones are dropped first. None means no limit.
+    ttl : float or None
+        How many seconds a cached output stays valid. None means forever.
+
+    Can be used bare (`@component`) or with arguments (`@component(ttl=60)`).
+    """
+    if fn is not None:
+        return CachedComponent(fn, maxsize, ttl)
+
+    def decorator(fn: Callable[..., Any]) -> CachedComponent:
+        return CachedComponent(fn, maxsize, ttl)
+
+    return decorator
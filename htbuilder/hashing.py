@@ -0,0 +1,128 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Fingerprint trees without rendering them, for ETags and caches.
+
+Usage
+-----
+
+>>> from htbuilder.hashing import fingerprint
+>>>
+>>> page = build_page(user)
+>>> etag = f'"{fingerprint(page)}"'
+>>>
+>>> if request.headers.get("If-None-Match") == etag:
+...     return Response(status=304)  # No rendering needed.
+>>>
+>>> return Response(str(page), headers={"ETag": etag})
+
+Two trees have the same fingerprint when they have the same tags, attributes
+and text in the same places, so they always render the same. (Fragments and
+adjacent strings count, so some trees that render the same get different
+fingerprints.)
+
+To hash the rendered output instead, pass a `digest` to the renderers in
+htbuilder.render and htbuilder.streaming.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from . import HtmlElement
+from .render import _leaf_chunks
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any
+
+_BATCH_SIZE = 4096
+
+
+def fingerprint(node: Any, digest: Any = None) -> str:
+    """Return a hex digest of the structure and content of `node`.
+
+    Parameters
+    ----------
+    node : HtmlElement or any child value
+        The tree to fingerprint.
+    digest : hash object or None
+        What to hash with: anything with update(bytes) and hexdigest()
+        methods, like hashlib.sha256() or xxhash.xxh3_128(). Defaults to a
+        128-bit BLAKE2b.
+
+    Children that are neither elements nor strings are hashed by their HTML,
+    so file-backed ones (see htbuilder.blobs) get read, in chunks. Children
+    with an __html_fingerprint__() method, like streaming.Deferred, are
+    hashed by the (kind, node) pair it returns instead, so nothing waits.
+    """
+    if digest is None:
+        digest = hashlib.blake2b(digest_size=16)
+
+    update = digest.update
+    # Hashing many small strings is slow, so they're hashed in batches.
+    parts: list[str] = []
+    append = parts.append
+    stack = [node]
+
+    def flush() -> None:
+        update("".join(parts).encode("utf-8", "surrogatepass"))
+        parts.clear()
+
+    # Each piece is tagged, and counts and lengths go in too, so different
+    # trees can't produce the same stream.
+    while stack:
+        item = stack.pop()
+
+        if isinstance(item, HtmlElement):
+            attrs = item._attrs
+            children = item._children
+            append(f"\1{item._tag}\0{len(attrs)}\0{len(children)}\0")
+
+            for name, value in attrs.items():
+                value = str(value)
+                append(f"{len(name)}:{name}{len(value)}:{value}")
+
+            stack.extend(reversed(children))
+
+        elif isinstance(item, str):
+            append(f"\2{len(item)}:")
+            append(item)
+
+        elif type(item) in (int, float):
+            append(f"\5{item}\0")
+
+        elif hasattr(type(item), "__html_fingerprint__"):
+            kind, stand_in = item.__html_fingerprint__()
+            if stand_in is None:
+                append(f"\6{len(kind)}:{kind}0")
+            else:
+                append(f"\6{len(kind)}:{kind}1")
+                stack.append(stand_in)
+
+        else:
+            for chunk in _leaf_chunks(item):
+                append(f"\3{len(chunk)}:")
+                append(chunk)
+                if len(parts) >= _BATCH_SIZE:
+                    flush()
+            append("\4")
+
+        if len(parts) >= _BATCH_SIZE:
+            flush()
+
+    flush()
+    return digest.hexdigest()
@@ -0,0 +1,189 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Shrink trees before rendering them, without changing their HTML.
+
+Usage
+-----
+
+>>> from htbuilder import div, fragment, li, ul
+>>> from htbuilder.optimize import optimize
+>>>
+>>> def item(i):
+...     return fragment(li("Item ", i), "\\n")
+>>>
+>>> dom = ul(item(i) for i in range(1000))
+>>> optimize(dom)  # Now a <ul> with 1000 <li> and 1000 "\\n" children.
+>>>
+>>> # Or turn every subtree that only holds elements, strings and numbers
+>>> # into a single string. Fastest to render, but there's less to query.
+>>> optimize(dom, prerender=True)  # Now a <ul> with a single string child.
+
+optimize() changes the tree in place (and returns it):
+
+* Fragments are replaced by their children.
+* Adjacent strings and numbers are joined into one string.
+* Empty strings and None are dropped. Note that str() renders None children
+  as "None", so this is the one change you can see in the output.
+* With prerender=True, child elements whose whole subtree is static are
+  replaced by their HTML.
+
+Other children, like streaming.Deferred, are kept as they are, and text is
+never joined across them.
+
+To normalize children as they're added instead, build the elements inside
+a normalize_on_insert() block:
+
+>>> with normalize_on_insert():
+...     dom = ul(item(i) for i in range(1000))
+
+Only elements built inside the block (in the same thread or async task) are
+affected, and they keep normalizing children added to them later, after the
+block ends. Fragments are spliced when added, so changing a fragment later
+doesn't affect the elements it was added to.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+from . import HtmlElement, _on_insert_var
+from .render import iter_render
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable, Iterator
+
+# Children that render to exactly str(child), so they can be joined up.
+_TEXT_TYPES = (str, int, float)
+
+
+def optimize(node: Any, prerender: bool = False) -> Any:
+    """Simplify `node`'s subtree in place. Returns `node`."""
+    if not isinstance(node, HtmlElement):
+        return node
+
+    # Collect elements parents-first, then work children-first, so fragments
+    # are already flat by the time they're spliced in.
+    order = []
+    seen = set()
+    stack = [node]
+
+    while stack:
+        element = stack.pop()
+        if element in seen:
+            continue
+        seen.add(element)
+        order.append(element)
+
+        for child in _owned_children(element):
+            if isinstance(child, HtmlElement):
+                stack.append(child)
+
+    static: set[HtmlElement] = set()
+
+    for element in reversed(order):
+        if not element._children or _optimize_children(element, static, prerender):
+            static.add(element)
+
+    return node
+
+
+@contextmanager
+def normalize_on_insert(enabled: bool = True) -> Iterator[None]:
+    """Splice fragments and join text in elements built inside this block.
+
+    Pass enabled=False to build plain elements inside an enclosing block.
+    """
+    token = _on_insert_var.set(_insert if enabled else None)
+    try:
+        yield
+    finally:
+        _on_insert_var.reset(token)
+
+
+def _owned_children(element: HtmlElement) -> list[Any]:
+    """Return element's children list, making sure it's safe to change."""
+    element._own_children()
+    if element._shared:
+        element._unshare()
+    return element._children
+
+
+def _optimize_children(
+    element: HtmlElement, static: set[HtmlElement], prerender: bool
+) -> bool:
+    """Rewrite element's children. Returns whether the subtree is static."""
+    is_static = True
+    out: list[Any] = []
+    text: list[str] = []
+
+    for child in _splice(element._children):
+        if isinstance(child, _TEXT_TYPES):
+            if child != "":
+                text.append(child if isinstance(child, str) else str(child))
+            continue
+
+        if child is None:
+            continue
+
+        if isinstance(child, HtmlElement) and child in static:
+            if prerender:
+                text.extend(iter_render(child))
+                continue
+        else:
+            is_static = False
+
+        if text:
+            out.append("".join(text))
+            text = []
+        out.append(child)
+
+    if text:
+        out.append("".join(text))
+
+    if out != element._children:
+        element._children[:] = out
+        if element._observers:
+            element._notify()
+
+    return is_static
+
+
+def _splice(children: list[Any]) -> Iterable[Any]:
+    for child in children:
+        if isinstance(child, HtmlElement) and child._tag is None:
+            # Already optimized, so it has no fragments of its own.
+            yield from child._children
+        else:
+            yield child
+
+
+def _insert(children: list[Any], new_children: list[Any]) -> None:
+    for child in new_children:
+        if child is None or (isinstance(child, str) and not child):
+            continue
+
+        if isinstance(child, HtmlElement) and child._tag is None:
+            _insert(children, child._children)
+        elif (
+            isinstance(child, _TEXT_TYPES)
+            and children
+            and isinstance(children[-1], _TEXT_TYPES)
+        ):
+            children[-1] = f"{children[-1]}{child}"
+        else:
+            children.append(child)
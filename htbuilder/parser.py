@@ -0,0 +1,270 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Turn existing HTML markup into HtmlElement trees.
+
+Usage
+-----
+
+>>> from htbuilder.parser import parse
+>>>
+>>> dom = parse('<div id="main"><p>Hello <b>world</b></p></div>')
+>>> dom._children[0].id
+"main"
+>>> str(dom)
+'<div id="main"><p>Hello <b>world</b></p></div>'
+
+Text is kept exactly as written (entities included), since htbuilder never
+escapes children. Attribute names have their dashes turned into underscores,
+so `data-foo` can be read back as `element.data_foo`.
+
+For large inputs, feed the markup in pieces:
+
+>>> builder = TreeBuilder()
+>>> for chunk in chunks:
+...     builder.feed(chunk)
+>>> dom = builder.finish()
+
+...or get top-level nodes back as soon as they're complete:
+
+>>> for node in iterparse(open("huge.html")):
+...     do_something(node)
+
+If you only need to touch the outer layers of a document, pass `raw_depth`
+and everything nested deeper is kept as a verbatim string rather than turned
+into elements:
+
+>>> dom = parse(markup, raw_depth=1)
+"""
+
+from __future__ import annotations
+
+from html.parser import HTMLParser
+
+from . import EMPTY_ELEMENTS, HtmlElement
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable, Iterator
+
+# How many characters iterparse() reads at a time from file-like sources.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class TreeBuilder(HTMLParser):
+    def __init__(self, raw_depth: int | None = None):
+        """Incremental HTML parser that builds HtmlElement trees.
+
+        Parameters
+        ----------
+        raw_depth : int or None
+            Elements nested at least this deep are not parsed into
+            HtmlElements, but kept as the exact markup they came from. Use 0
+            to keep the whole input as a string, or None (the default) to
+            build elements all the way down.
+
+        """
+        super().__init__(convert_charrefs=False)
+        self._raw_depth = raw_depth
+        self._root = HtmlElement(None)
+        self._stack = [self._root]
+        self._pending: list[str] = []
+        # Tags open inside the current raw region, innermost last.
+        self._raw_tags: list[str] = []
+        self._completed: list[Any] = []
+
+    def close(self) -> None:
+        """Finish parsing, treating anything still buffered as complete."""
+        super().close()
+        self._flush()
+
+    def finish(self) -> HtmlElement:
+        """Finish parsing and return the tree as a fragment."""
+        self.close()
+        return self._root
+
+    def pop_completed(self) -> list[Any]:
+        """Remove and return the top-level nodes that are fully parsed."""
+        self._flush_top_level()
+        completed = self._completed
+        self._completed = []
+        return completed
+
+    # HTMLParser hooks.
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._start(tag, attrs, self.get_starttag_text(), tag not in EMPTY_ELEMENTS)
+
+    def handle_startendtag(
+        self, tag: str, attrs: list[tuple[str, str | None]]
+    ) -> None:
+        self._start(tag, attrs, self.get_starttag_text(), False)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._raw_tags:
+            if tag in self._raw_tags:
+                # Close up to the matching tag, like "</ul>" after "<li>a<li>b".
+                index = len(self._raw_tags) - 1 - self._raw_tags[::-1].index(tag)
+                del self._raw_tags[index:]
+                self._pending.append(f"</{tag}>")
+                return
+
+            if not any(element._tag == tag for element in self._stack):
+                # A stray end tag: keep it, since raw regions are verbatim.
+                self._pending.append(f"</{tag}>")
+                return
+
+            # It closes an element outside the raw region, which implicitly
+            # closes everything still open inside it.
+            self._raw_tags = []
+
+        # Close everything up to the matching tag. Stray end tags are dropped.
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i]._tag == tag:
+                self._flush()
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data: str) -> None:
+        self._pending.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self._pending.append(f"&{name};")
+
+    def handle_charref(self, name: str) -> None:
+        self._pending.append(f"&#{name};")
+
+    def handle_comment(self, data: str) -> None:
+        self._pending.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl: str) -> None:
+        self._pending.append(f"<!{decl}>")
+
+    def handle_pi(self, data: str) -> None:
+        self._pending.append(f"<?{data}>")
+
+    def unknown_decl(self, data: str) -> None:
+        self._pending.append(f"<![{data}]>")
+
+    # Internals.
+
+    def _start(
+        self,
+        tag: str,
+        attrs: list[tuple[str, str | None]],
+        source: str | None,
+        has_children: bool,
+    ) -> None:
+        if self._raw_tags or (
+            self._raw_depth is not None and len(self._stack) > self._raw_depth
+        ):
+            self._pending.append(source or f"<{tag}>")
+            if has_children:
+                self._raw_tags.append(tag)
+            return
+
+        self._flush()
+        element = HtmlElement(tag)
+        # Set directly so an attribute called "tag" can't clash with __init__.
+        element._attrs = {_attr_name(k): _attr_value(v) for k, v in attrs}
+        self._stack[-1]._children.append(element)
+
+        if has_children:
+            self._stack.append(element)
+
+    def _flush(self) -> None:
+        # Runs of text (and raw markup) become a single string child.
+        if self._pending:
+            self._stack[-1]._children.append("".join(self._pending))
+            self._pending = []
+
+    def _flush_top_level(self) -> None:
+        if len(self._stack) == 1 and not self._raw_tags:
+            self._flush()
+
+        children = self._root._children
+        done = len(children)
+
+        # The last top-level element may still be receiving children.
+        if len(self._stack) > 1:
+            done -= 1
+
+        self._completed += children[:done]
+        del children[:done]
+
+
+def parse(markup: str, raw_depth: int | None = None) -> HtmlElement:
+    """Parse an HTML string into a fragment holding its top-level nodes.
+
+    See TreeBuilder for the meaning of `raw_depth`.
+    """
+    builder = TreeBuilder(raw_depth=raw_depth)
+    builder.feed(markup)
+    return builder.finish()
+
+
+def iterparse(
+    source: Any,
+    raw_depth: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Any]:
+    """Parse HTML incrementally, yielding top-level nodes as they complete.
+
+    Parameters
+    ----------
+    source : file-like or iterable of str
+        Anything with a `read()` method, or an iterable of markup chunks.
+    raw_depth : int or None
+        See TreeBuilder.
+    chunk_size : int
+        How many characters to read at a time from file-like sources.
+
+    """
+    builder = TreeBuilder(raw_depth=raw_depth)
+
+    for chunk in _read_chunks(source, chunk_size):
+        builder.feed(chunk)
+        yield from builder.pop_completed()
+
+    builder.close()
+    yield from builder.pop_completed()
+
+
+def _read_chunks(source: Any, chunk_size: int) -> Iterable[str]:
+    read = getattr(source, "read", None)
+
+    if read is None:
+        yield from source
+        return
+
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _attr_name(name: str) -> str:
+    return name.replace("-", "_")
+
+
+def _attr_value(value: str | None) -> str:
+    # Boolean attributes like "disabled" come in as None.
+    if value is None:
+        return ""
+
+    # HTMLParser unescapes values, but htbuilder writes them out verbatim.
+    return value.replace("&", "&amp;").replace('"', "&quot;")
@@ -0,0 +1,685 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Find elements in a tree by id, tag, class, attribute or CSS selector.
+
+Usage
+-----
+
+>>> from htbuilder import a, div, nav
+>>> from htbuilder.query import select, select_one
+>>>
+>>> dom = div(id="main")(nav(_class="menu")(a(href="/"), a(href="/about")))
+>>>
+>>> for link in select(dom, "nav.menu > a[href]"):
+...     link(_class="nav-link")
+>>>
+>>> select_one(dom, "#main")
+
+Lookups go through an index that is built the first time a tree is queried,
+so repeated queries cost O(1) (for ids) or O(number of matches) rather than a
+walk over the whole tree. The index is kept on the root element, and goes away
+with it. It notices changes made through the normal element API (calling an
+element, setting or deleting attributes), and on the next query it updates
+itself by looking at the elements that changed, not at the whole tree. Editing
+`_children` lists by hand is not noticed; call `index(root).invalidate()`
+after doing that.
+
+Supported selectors: `tag`, `*`, `#id`, `.class`, `[attr]`, `[attr=value]`
+(value optionally quoted), any combination of those, the descendant (space)
+and child (`>`) combinators, and comma-separated lists. Fragments are
+transparent: their children count as children of the enclosing element.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import weakref
+
+from . import HtmlElement, _add_observers, _clean_name
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Iterable
+
+_TOKEN = re.compile(
+    r"""
+    \s*(?P<combinator>[>,])\s*
+    | (?P<space>\s+)
+    | \#(?P<id>[\w-]+)
+    | \.(?P<cls>[\w-]+)
+    | \[\s*(?P<attr>[\w-]+)\s*(?:=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\]\s]*))\s*)?\]
+    | (?P<tag>\*|[\w-]+)
+    """,
+    re.VERBOSE,
+)
+
+class _Compound:
+    __slots__ = ("tag", "id", "classes", "attrs")
+
+    def __init__(self) -> None:
+        """One compound selector, like `a.btn[href]`."""
+        self.tag: str | None = None
+        self.id: str | None = None
+        self.classes: list[str] = []
+        self.attrs: list[tuple[str, str | None]] = []
+
+
+class Index:
+    def __init__(self, root: HtmlElement):
+        """Lookup tables for every element under (and including) `root`."""
+        self._root = root
+        self._ref = weakref.ref(self)
+        # Trees can be queried from many threads at once.
+        self._lock = threading.RLock()
+
+        # Set when the whole index has to be rebuilt. Otherwise, elements that
+        # changed are collected in _changed, and only they get looked at again.
+        self._dirty = True
+        self._changed: dict[HtmlElement, None] = {}
+
+        # Each indexed element (fragments included) maps to its parent, which
+        # may be a fragment, and its position in that parent's _children.
+        self._links: dict[HtmlElement, tuple[HtmlElement | None, int]] = {}
+        # Copies of the _children lists, as they were when last indexed, of
+        # the elements that have child elements.
+        self._kids: dict[HtmlElement, list[Any]] = {}
+        # Elements found in more than one place, and how many extra times.
+        self._extra: dict[HtmlElement, int] = {}
+        # What each element was indexed under: "#" + id and "." + class token.
+        self._keys: dict[HtmlElement, tuple[str, ...]] = {}
+        # Document order. Dropped when elements are added to the tree, and
+        # then computed from _links for the results of each query instead.
+        self._position: dict[HtmlElement, int] | None = None
+
+        # Ids map to an element, or to a list of them if the id is repeated.
+        self._by_id: dict[str, Any] = {}
+        self._by_tag: dict[str, dict[HtmlElement, None]] = {}
+        self._by_class: dict[str, dict[HtmlElement, None]] = {}
+
+        # Whether any element was borrowed from another tree (see
+        # HtmlElement.clone()), so results may need copies of their own.
+        self._may_borrow = False
+
+    def by_id(self, id: str) -> HtmlElement | None:
+        """The first element with this id, or None."""
+        with self._lock:
+            self._refresh()
+            found = self._by_id.get(id)
+
+            if isinstance(found, list):
+                found = min(found, key=self._order_key())
+            return found if found is None else self._own(found)
+
+    def by_tag(self, tag: str) -> list[HtmlElement]:
+        """All elements with this tag, in document order."""
+        with self._lock:
+            self._refresh()
+            return self._results(list(self._by_tag.get(tag.lower(), ())))
+
+    def by_class(self, name: str) -> list[HtmlElement]:
+        """All elements that have this class token, in document order."""
+        with self._lock:
+            self._refresh()
+            return self._results(list(self._by_class.get(name, ())))
+
+    def parent(self, element: HtmlElement) -> HtmlElement | None:
+        """The closest enclosing element, skipping fragments."""
+        with self._lock:
+            self._refresh()
+            parent = self._parent(element)
+            return parent if parent is None else self._own(parent)
+
+    def ancestors(self, element: HtmlElement) -> list[HtmlElement]:
+        """All enclosing elements, outermost first."""
+        with self._lock:
+            self._refresh()
+            out = []
+            parent = self._parent(element)
+            if parent is not None:
+                parent = self._own(parent)
+
+            while parent is not None:
+                out.append(parent)
+                parent = self._parent(parent)
+
+            out.reverse()
+            return out
+
+    def select(self, selector: str) -> list[HtmlElement]:
+        """All elements matching a CSS selector, in document order."""
+        with self._lock:
+            self._refresh()
+            found: dict[HtmlElement, None] = {}
+
+            for chain in _parse(selector):
+                for element in self._candidates(chain[-1][1]):
+                    if self._matches(element, chain, len(chain) - 1):
+                        found[element] = None
+
+            return self._results(list(found))
+
+    def select_one(self, selector: str) -> HtmlElement | None:
+        """The first element matching a CSS selector, or None."""
+        matches = self.select(selector)
+        return matches[0] if matches else None
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on the next query."""
+        self._dirty = True
+
+    # Called by HtmlElement when an element in the tree changes.
+    def _invalidate(self, element: HtmlElement | None = None) -> None:
+        if element is None:
+            self._dirty = True
+        else:
+            self._changed[element] = None
+
+    def _refresh(self) -> None:
+        while self._changed and not self._dirty:
+            element, _ = self._changed.popitem()
+            if element in self._links:
+                self._update(element)
+
+        if not self._dirty:
+            return
+
+        self._changed.clear()
+        self._links = {}
+        self._kids = {}
+        self._extra = {}
+        self._keys = {}
+        self._by_id = {}
+        self._by_tag = {}
+        self._by_class = {}
+        self._may_borrow = False
+        self._dirty = False
+
+        self._position = {}
+        self._add(self._root, None, 0, True)
+
+    def _add(
+        self,
+        element: HtmlElement,
+        parent: HtmlElement | None,
+        slot: int,
+        building: bool = False,
+    ) -> None:
+        """Index `element` and everything under it."""
+        links = self._links
+        all_kids = self._kids
+        by_tag = self._by_tag
+        extra = self._extra
+        position = self._position if building else None
+
+        if element in links:
+            # Can't tell which place it's in, so start over.
+            self._dirty = True
+            return
+
+        links[element] = (parent, slot)
+        added = []
+        stack = [element]
+
+        while stack:
+            element = stack.pop()
+            added.append(element)
+
+            if position is not None:
+                position[element] = len(position)
+
+            if element._tag is not None:
+                tag = _clean_name(element._tag)
+                bucket = by_tag.get(tag)
+                if bucket is None:
+                    bucket = by_tag[tag] = {}
+                bucket[element] = None
+
+                if element._attrs:
+                    keys = _attr_keys(element)
+                    if keys:
+                        self._add_keys(element, keys)
+
+            if element._borrowed:
+                self._may_borrow = True
+
+            children = element._children
+            new_kids = []
+            has_kids = False
+
+            for i, kid in enumerate(children):
+                if not isinstance(kid, HtmlElement):
+                    continue
+
+                has_kids = True
+
+                if kid not in links:
+                    links[kid] = (element, i)
+                    new_kids.append(kid)
+                elif building:
+                    extra[kid] = extra.get(kid, 0) + 1
+                else:
+                    self._dirty = True
+
+            if has_kids:
+                all_kids[element] = list(children)
+                new_kids.reverse()
+                stack += new_kids
+
+        _add_observers(added, self._ref)
+
+    def _remove(self, element: HtmlElement) -> None:
+        """Forget `element` and everything under it."""
+        links = self._links
+        stack = [element]
+
+        while stack:
+            element = stack.pop()
+
+            if element in self._extra:
+                self._dirty = True
+                continue
+
+            if links.pop(element, None) is None:
+                continue
+
+            if self._position is not None:
+                del self._position[element]
+
+            if element._tag is not None:
+                del self._by_tag[_clean_name(element._tag)][element]
+                self._remove_keys(element)
+
+            stack.extend([c for c in self._kids.pop(element, ()) if isinstance(c, HtmlElement)])
+
+    def _update(self, element: HtmlElement) -> None:
+        """Update the index for a change to `element` itself."""
+        if element._tag is not None:
+            keys = _attr_keys(element)
+            if keys != self._keys.get(element, ()):
+                self._remove_keys(element)
+                self._add_keys(element, keys)
+
+        if element._borrowed:
+            self._may_borrow = True
+
+        old = self._kids.get(element, [])
+        children = element._children
+
+        if children[: len(old)] == old:
+            # Children were only added at the end, which is the usual case.
+            added = [
+                (i, children[i])
+                for i in range(len(old), len(children))
+                if isinstance(children[i], HtmlElement)
+            ]
+        else:
+            counts: dict[HtmlElement, int] = {}
+            for kid in old:
+                if isinstance(kid, HtmlElement):
+                    counts[kid] = counts.get(kid, 0) + 1
+
+            added = []
+            for i, kid in enumerate(children):
+                if not isinstance(kid, HtmlElement):
+                    continue
+
+                count = counts.get(kid, 0)
+                if count:
+                    counts[kid] = count - 1
+                    if self._links[kid][0] is element:
+                        self._links[kid] = (element, i)
+                else:
+                    added.append((i, kid))
+
+            for kid, count in counts.items():
+                for _ in range(count):
+                    self._remove(kid)
+
+            # Siblings may have moved around.
+            self._position = None
+
+        if added or any(isinstance(c, HtmlElement) for c in old):
+            self._kids[element] = list(children)
+        else:
+            self._kids.pop(element, None)
+
+        if added:
+            self._position = None
+            for i, kid in added:
+                self._add(kid, element, i)
+
+    def _add_keys(self, element: HtmlElement, keys: tuple[str, ...]) -> None:
+        if not keys:
+            return
+
+        self._keys[element] = keys
+
+        for key in keys:
+            name = key[1:]
+
+            if key[0] == "#":
+                found = self._by_id.get(name)
+                if found is None:
+                    self._by_id[name] = element
+                elif isinstance(found, list):
+                    found.append(element)
+                else:
+                    self._by_id[name] = [found, element]
+            else:
+                bucket = self._by_class.get(name)
+                if bucket is None:
+                    bucket = self._by_class[name] = {}
+                bucket[element] = None
+
+    def _remove_keys(self, element: HtmlElement) -> None:
+        for key in self._keys.pop(element, ()):
+            name = key[1:]
+
+            if key[0] == "#":
+                found = self._by_id[name]
+                if isinstance(found, list):
+                    found.remove(element)
+                    if len(found) == 1:
+                        self._by_id[name] = found[0]
+                else:
+                    del self._by_id[name]
+            else:
+                self._by_class[name].pop(element, None)
+
+    def _parent(self, element: HtmlElement) -> HtmlElement | None:
+        link = self._links.get(element)
+        parent = link and link[0]
+
+        while parent is not None and parent._tag is None:
+            parent = self._links[parent][0]
+
+        return parent
+
+    def _path(self, element: HtmlElement) -> list[int]:
+        """Where `element` is, as positions among siblings from the root."""
+        links = self._links
+        path = []
+        parent, slot = links[element]
+
+        while parent is not None:
+            path.append(slot)
+            parent, slot = links[parent]
+
+        path.reverse()
+        return path
+
+    def _order_key(self) -> Callable[[HtmlElement], Any]:
+        if self._position is not None:
+            return self._position.__getitem__
+        return self._path
+
+    def _results(self, elements: list[HtmlElement]) -> list[HtmlElement]:
+        """Sort found elements, and make sure they're safe to change."""
+        if len(elements) > 1:
+            elements.sort(key=self._order_key())
+
+        if self._may_borrow:
+            elements = [self._own(element) for element in elements]
+
+        return elements
+
+    def _own(self, element: HtmlElement) -> HtmlElement:
+        """Return `element`, or the copy of it that only belongs to this tree.
+
+        If any element on the way from the root is borrowed from another tree,
+        the elements after it are swapped for clones, one level at a time, so
+        the rest of the tree stays shared.
+        """
+        if not self._may_borrow:
+            return element
+
+        links = self._links
+        path = [element]
+        parent = links[element][0]
+
+        while parent is not None:
+            path.append(parent)
+            parent = links[parent][0]
+
+        path.reverse()
+
+        for i in range(len(path) - 1):
+            parent, child = path[i], path[i + 1]
+
+            if not parent._borrowed or child in (parent._owned or ()):
+                continue
+
+            slot = links[child][1]
+            if parent._children[slot] is not child:
+                # The children were changed by hand.
+                slot = parent._children.index(child)
+
+            new = parent._own_child(slot)
+            self._replace(parent, child, new)
+            path[i + 1] = new
+
+        return path[-1]
+
+    def _replace(self, parent: HtmlElement, old: HtmlElement, new: HtmlElement) -> None:
+        """Put `new` in the index where `old` was, keeping old's subtree."""
+        if self._dirty or old in self._extra:
+            # It's still somewhere else in the tree too, so start over.
+            self._dirty = True
+        else:
+            links = self._links
+            links[new] = links.pop(old)
+
+            if self._position is not None:
+                self._position[new] = self._position.pop(old)
+
+            kids = self._kids.pop(old, None)
+            if kids is not None:
+                self._kids[new] = kids
+                for kid in kids:
+                    if isinstance(kid, HtmlElement):
+                        link = links.get(kid)
+                        if link is not None and link[0] is old:
+                            links[kid] = (new, link[1])
+
+            if new._tag is not None:
+                bucket = self._by_tag[_clean_name(new._tag)]
+                del bucket[old]
+                bucket[new] = None
+
+                keys = self._keys.get(old, ())
+                self._remove_keys(old)
+                self._add_keys(new, keys)
+
+            self._kids[parent][links[new][1]] = new
+
+        new._add_observer(self._ref)
+        # Other indexes that include `parent` must forget `old` too.
+        if parent._observers:
+            parent._notify(skip=self)
+
+    def _candidates(self, compound: _Compound) -> Iterable[HtmlElement]:
+        if compound.id is not None:
+            found = self._by_id.get(compound.id)
+            if found is None:
+                return ()
+            return found if isinstance(found, list) else (found,)
+        if compound.classes:
+            return self._by_class.get(compound.classes[0], ())
+        if compound.tag is not None:
+            return self._by_tag.get(compound.tag, ())
+        return [element for element in self._links if element._tag is not None]
+
+    def _matches(self, element: HtmlElement, chain: list[Any], i: int) -> bool:
+        combinator, compound = chain[i]
+
+        if not _matches_compound(element, compound):
+            return False
+        if i == 0:
+            return True
+
+        parent = self._parent(element)
+
+        if combinator == ">":
+            return parent is not None and self._matches(parent, chain, i - 1)
+
+        while parent is not None:
+            if self._matches(parent, chain, i - 1):
+                return True
+            parent = self._parent(parent)
+
+        return False
+
+
+# Makes sure each tree gets a single index.
+_index_lock = threading.Lock()
+
+
+def index(root: HtmlElement) -> Index:
+    """Get the index for a tree, which is kept for as long as `root` is."""
+    found = root._index
+
+    if found is None:
+        with _index_lock:
+            found = root._index
+            if found is None:
+                found = root._index = Index(root)
+
+    return found
+
+
+def select(root: HtmlElement, selector: str) -> list[HtmlElement]:
+    """All elements under `root` (inclusive) matching a CSS selector."""
+    return index(root).select(selector)
+
+
+def select_one(root: HtmlElement, selector: str) -> HtmlElement | None:
+    """The first element under `root` (inclusive) matching a CSS selector."""
+    return index(root).select_one(selector)
+
+
+def _attr_keys(element: HtmlElement) -> tuple[str, ...]:
+    """Return "#" + id and "." + class token for what `element` has."""
+    keys = []
+
+    for name, value in element._attrs.items():
+        cleaned = _clean_name(name)
+        if cleaned == "id":
+            keys.append(f"#{value}")
+        elif cleaned == "class":
+            keys.extend([f".{token}" for token in str(value).split()])
+
+    return tuple(keys)
+
+
+def _matches_compound(element: HtmlElement, compound: _Compound) -> bool:
+    if compound.tag is not None and _clean_name(element._tag) != compound.tag:  # type: ignore[arg-type]
+        return False
+
+    if compound.id is None and not compound.classes and not compound.attrs:
+        return True
+
+    attrs = {_clean_name(k): str(v) for k, v in element._attrs.items()}
+
+    if compound.id is not None and attrs.get("id") != compound.id:
+        return False
+
+    if compound.classes:
+        tokens = attrs.get("class", "").split()
+        if any(name not in tokens for name in compound.classes):
+            return False
+
+    for name, value in compound.attrs:
+        if name not in attrs:
+            return False
+        if value is not None and attrs[name] != value:
+            return False
+
+    return True
+
+
+_parsed: dict[str, list[list[tuple[str, _Compound]]]] = {}
+
+
+def _parse(selector: str) -> list[list[tuple[str, _Compound]]]:
+    """Parse a selector list into chains of (combinator, compound) pairs."""
+    cached = _parsed.get(selector)
+    if cached is not None:
+        return cached
+
+    chains: list[list[tuple[str, _Compound]]] = []
+    chain: list[tuple[str, _Compound]] = []
+    compound: _Compound | None = None
+    combinator = " "
+    pos = 0
+    text = selector.strip()
+
+    def finish_compound() -> None:
+        nonlocal compound
+        if compound is not None:
+            chain.append((combinator, compound))
+            compound = None
+
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Unsupported selector: {selector!r}")
+        pos = match.end()
+
+        if match.group("combinator") or match.group("space"):
+            if compound is None:
+                raise ValueError(f"Unsupported selector: {selector!r}")
+            finish_compound()
+
+            if match.group("combinator") == ",":
+                chains.append(chain)
+                chain = []
+                combinator = " "
+            else:
+                combinator = match.group("combinator") or " "
+            continue
+
+        if compound is None:
+            compound = _Compound()
+
+        if match.group("tag"):
+            if compound.tag is not None or compound.id or compound.classes or compound.attrs:
+                raise ValueError(f"Unsupported selector: {selector!r}")
+            tag = match.group("tag").lower()
+            compound.tag = None if tag == "*" else tag
+        elif match.group("id"):
+            compound.id = match.group("id")
+        elif match.group("cls"):
+            compound.classes.append(match.group("cls"))
+        else:
+            value = match.group("dq")
+            if value is None:
+                value = match.group("sq")
+            if value is None:
+                value = match.group("uq")
+            compound.attrs.append((match.group("attr").lower(), value))
+
+    if compound is None:
+        raise ValueError(f"Unsupported selector: {selector!r}")
+
+    finish_compound()
+    chains.append(chain)
+
+    if len(_parsed) < 256:
+        _parsed[selector] = chains
+
+    return chains
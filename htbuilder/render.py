@@ -0,0 +1,484 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Render HtmlElement trees piece by piece, without building the whole string.
+
+Usage
+-----
+
+>>> from htbuilder import div, table, tr, td
+>>> from htbuilder.render import iter_render, render_to_file
+>>>
+>>> dom = table(tr(td(i) for i in range(1000000)))
+>>>
+>>> # Write a huge document holding at most ~64K characters in memory:
+>>> render_to_file(dom, "report.html")
+>>>
+>>> # ...optionally compressing it on the fly:
+>>> render_to_file(dom, "report.html.gz", compression="gzip")
+>>>
+>>> # Or handle the chunks yourself:
+>>> for chunk in iter_render(dom):
+...     sock.send(chunk.encode())
+>>>
+>>> # Put a bound on the work done for trees you don't control:
+>>> html = render(dom, max_nodes=100000, max_time=0.5)
+>>>
+>>> # ...or cut the output short instead of raising:
+>>> html = render(dom, max_chars=1000000, truncate="<!-- truncated -->")
+>>>
+>>> # Hash the output while it's rendered, say for an ETag:
+>>> digest = hashlib.blake2b()
+>>> render_to_file(dom, "report.html", digest=digest)
+>>> etag = digest.hexdigest()
+
+"""
+
+from __future__ import annotations
+
+import time
+import zlib
+
+from . import HtmlElement, _tag_strings
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+# How many characters ChunkedWriter holds before writing them out.
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# zlib "wbits" that select the container around the deflate stream.
+_COMPRESSION_WBITS = {
+    "zlib": zlib.MAX_WBITS,
+    "gzip": zlib.MAX_WBITS | 16,
+}
+
+# How many nodes to render between clock reads when there's a max_time.
+_TIME_CHECK_INTERVAL = 256
+
+
+class RenderLimitExceeded(Exception):
+    def __init__(self, limit: str, value: float):
+        """Raised when rendering goes over one of its limits.
+
+        `limit` is the name of the argument that was exceeded, like
+        "max_nodes", and `value` is its value.
+        """
+        super().__init__(f"Rendering exceeded {limit}={value}")
+        self.limit = limit
+        self.value = value
+
+
+def iter_render(
+    node: Any,
+    leaf: Callable[[Any], Iterable[str]] | None = None,
+    max_nodes: int | None = None,
+    max_chars: int | None = None,
+    max_depth: int | None = None,
+    max_time: float | None = None,
+    truncate: str | None = None,
+    digest: Any = None,
+) -> Iterator[str]:
+    """Yield the HTML for `node` in small pieces.
+
+    Joining the pieces gives exactly str(node). The tree is walked without
+    recursion, so deep trees are fine too.
+
+    Parameters
+    ----------
+    node : HtmlElement or any child value
+        What to render.
+    leaf : callable or None
+        Called with every child that is neither an HtmlElement nor a string,
+        and should return an iterable of HTML chunks for it. By default such
+        children are rendered with their __html_chunks__() method if they
+        have one (see htbuilder.blobs), or else with str().
+    max_nodes : int or None
+        Most elements and text children to render.
+    max_chars : int or None
+        Most characters to output, not counting the truncation marker and the
+        closing tags after it. For ASCII output that's also the byte count.
+    max_depth : int or None
+        Most levels of nested elements. Fragments don't count.
+    max_time : float or None
+        Most seconds to spend rendering, counting from the first chunk. Only
+        checked every few hundred nodes, and time spent by the consumer
+        between chunks counts too.
+    truncate : str or None
+        When a limit is hit, output this marker and close all open tags
+        instead of raising RenderLimitExceeded.
+    digest : hash object or None
+        Anything with an update(bytes) method, like hashlib.blake2b() or
+        xxhash.xxh3_64(). It's updated with the UTF-8 encoded output as it's
+        rendered. It's only complete once all chunks were consumed.
+
+    """
+    if (
+        max_nodes is not None
+        or max_chars is not None
+        or max_depth is not None
+        or max_time is not None
+    ):
+        chunks = _iter_render_limited(
+            node, leaf, max_nodes, max_chars, max_depth, max_time, truncate
+        )
+    else:
+        chunks = _iter_render(node, leaf)
+
+    if digest is not None:
+        return _hash_chunks(chunks, digest)
+
+    return chunks
+
+
+def render(node: Any, **kwargs: Any) -> str:
+    """Render `node` to a string. Takes the same arguments as iter_render()."""
+    return "".join(iter_render(node, **kwargs))
+
+
+def _iter_render(
+    node: Any, leaf: Callable[[Any], Iterable[str]] | None
+) -> Iterator[str]:
+    # Each entry is (iterator over children, closing tag).
+    stack = [(iter((node,)), "")]
+
+    while stack:
+        children, end = stack[-1]
+
+        for child in children:
+            if not isinstance(child, HtmlElement):
+                # Strings (including pre-rendered ones) go out as they are.
+                if isinstance(child, str):
+                    yield child
+                elif leaf is not None:
+                    yield from leaf(child)
+                else:
+                    html_chunks = getattr(type(child), "__html_chunks__", None)
+                    if html_chunks is None:
+                        yield str(child)
+                    else:
+                        yield from html_chunks(child)
+                continue
+
+            if child._tag is None:
+                stack.append((iter(child._children), ""))
+                break
+
+            start, child_end = _tag_strings(child)
+            yield start
+
+            if not child._cannot_have_children:
+                stack.append((iter(child._children), child_end))
+                break
+
+        else:
+            stack.pop()
+            if end:
+                yield end
+
+
+def _iter_render_limited(
+    node: Any,
+    leaf: Callable[[Any], Iterable[str]] | None,
+    max_nodes: int | None,
+    max_chars: int | None,
+    max_depth: int | None,
+    max_time: float | None,
+    truncate: str | None,
+) -> Iterator[str]:
+    """Like _iter_render, but counting as it goes."""
+    inf = float("inf")
+    node_budget = inf if max_nodes is None else max_nodes
+    char_budget = inf if max_chars is None else max_chars
+    depth_budget = inf if max_depth is None else max_depth
+    deadline = inf if max_time is None else time.monotonic() + max_time
+
+    nodes = 0
+    chars = 0
+    depth = 0
+    exceeded: tuple[str, float] | None = None
+
+    stack = [(iter((node,)), "")]
+
+    while stack:
+        children, end = stack[-1]
+
+        for child in children:
+            nodes += 1
+            if nodes > node_budget:
+                exceeded = ("max_nodes", node_budget)
+                break
+            if nodes % _TIME_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                exceeded = ("max_time", max_time)  # type: ignore[assignment]
+                break
+
+            if not isinstance(child, HtmlElement):
+                if isinstance(child, str):
+                    chunks: Iterable[str] = (child,)
+                elif leaf is None:
+                    chunks = _leaf_chunks(child)
+                else:
+                    chunks = leaf(child)
+
+                for chunk in chunks:
+                    chars += len(chunk)
+                    if chars > char_budget:
+                        exceeded = ("max_chars", char_budget)
+                        break
+                    yield chunk
+                else:
+                    continue
+                break
+
+            if child._tag is None:
+                stack.append((iter(child._children), ""))
+                break
+
+            if depth >= depth_budget:
+                exceeded = ("max_depth", depth_budget)
+                break
+
+            start, child_end = _tag_strings(child)
+            chars += len(start)
+            if chars > char_budget:
+                exceeded = ("max_chars", char_budget)
+                break
+            yield start
+
+            if not child._cannot_have_children:
+                depth += 1
+                stack.append((iter(child._children), child_end))
+                break
+
+        else:
+            stack.pop()
+            if end:
+                chars += len(end)
+                if chars > char_budget:
+                    # Leave it for the closing tags below.
+                    stack.append((children, end))
+                    exceeded = ("max_chars", char_budget)
+                    break
+                depth -= 1
+                yield end
+            continue
+
+        if exceeded is not None:
+            break
+
+    if exceeded is None:
+        return
+
+    if truncate is None:
+        raise RenderLimitExceeded(*exceeded)
+
+    yield truncate
+
+    # Closing tags are always allowed through, so the output stays balanced.
+    for _, end in reversed(stack):
+        if end:
+            yield end
+
+
+def _hash_chunks(
+    chunks: Iterable[str], digest: Any, encoding: str = "utf-8"
+) -> Iterator[str]:
+    """Pass chunks through, feeding them to `digest` in batches."""
+    update = digest.update
+    pending: list[str] = []
+    size = 0
+
+    for chunk in chunks:
+        yield chunk
+        pending.append(chunk)
+        size += len(chunk)
+
+        if size >= DEFAULT_BUFFER_SIZE:
+            update("".join(pending).encode(encoding))
+            pending = []
+            size = 0
+
+    if pending:
+        update("".join(pending).encode(encoding))
+
+
+def _leaf_chunks(child: Any) -> Iterable[str]:
+    """Render a child that is neither an HtmlElement nor a string."""
+    html_chunks = getattr(type(child), "__html_chunks__", None)
+    if html_chunks is None:
+        return (str(child),)
+    return html_chunks(child)
+
+
+class ChunkedWriter:
+    def __init__(
+        self,
+        fp: BinaryIO,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        flush_interval: int | None = None,
+        compression: str | None = None,
+        compresslevel: int = 6,
+        encoding: str = "utf-8",
+        digest: Any = None,
+    ):
+        """Buffered, optionally compressing, text writer over a binary file.
+
+        Parameters
+        ----------
+        fp : binary file object
+            Where the (encoded, maybe compressed) output goes.
+        buffer_size : int
+            How many characters to hold before encoding them and writing them
+            to `fp`. This bounds the memory used by the writer.
+        flush_interval : int or None
+            Call fp.flush() every time at least this many more bytes were
+            written to it. None means only flush on close().
+        compression : "gzip", "zlib" or None
+            Compress the output on the fly.
+        compresslevel : int
+            Compression level, from 0 to 9.
+        encoding : str
+            Text encoding for the output.
+        digest : hash object or None
+            Gets updated with the encoded output, before compression. See
+            iter_render().
+
+        """
+        if compression is not None and compression not in _COMPRESSION_WBITS:
+            raise ValueError(f"Unknown compression {compression!r}")
+
+        self._fp = fp
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._encoding = encoding
+        self._digest = digest
+        self._compressor = (
+            zlib.compressobj(compresslevel, zlib.DEFLATED, _COMPRESSION_WBITS[compression])
+            if compression
+            else None
+        )
+
+        self._parts: list[str] = []
+        self._buffered = 0
+        self._unflushed = 0
+        self.bytes_written = 0
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._buffered += len(text)
+
+        if self._buffered >= self._buffer_size:
+            self._drain()
+
+    def write_bytes(self, data: bytes) -> None:
+        """Write already encoded bytes, after everything written so far."""
+        self._drain()
+
+        if self._digest is not None:
+            self._digest.update(data)
+
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+
+        self._write_bytes(data)
+
+    def close(self) -> None:
+        """Write out everything that's buffered. Doesn't close the file."""
+        self._drain()
+
+        if self._compressor is not None:
+            self._write_bytes(self._compressor.flush())
+            self._compressor = None
+
+        self._fp.flush()
+        self._unflushed = 0
+
+    def _drain(self) -> None:
+        if not self._parts:
+            return
+
+        data = "".join(self._parts).encode(self._encoding)
+        self._parts = []
+        self._buffered = 0
+
+        if self._digest is not None:
+            self._digest.update(data)
+
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+
+        self._write_bytes(data)
+
+    def _write_bytes(self, data: bytes) -> None:
+        if not data:
+            return
+
+        self._fp.write(data)
+        self.bytes_written += len(data)
+        self._unflushed += len(data)
+
+        if self._flush_interval is not None and self._unflushed >= self._flush_interval:
+            self._fp.flush()
+            self._unflushed = 0
+
+    def __enter__(self) -> ChunkedWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_LIMIT_ARGS = ("max_nodes", "max_chars", "max_depth", "max_time", "truncate")
+
+
+def render_to_file(node: Any, file: Any, **kwargs: Any) -> int:
+    """Render `node` into a path or binary file object, chunk by chunk.
+
+    Takes the same keyword arguments as ChunkedWriter, plus the limits from
+    iter_render(). Returns how many bytes were written. If a limit is
+    exceeded without `truncate`, whatever was rendered so far is still
+    written before RenderLimitExceeded is raised.
+
+    Children with an __html_bytes__() method (see htbuilder.blobs) are
+    copied to the file as bytes when possible. When there are limits they're
+    decoded instead, so they can be counted.
+    """
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "wb") as fp:
+            return render_to_file(node, fp, **kwargs)
+
+    limits = {name: kwargs.pop(name) for name in _LIMIT_ARGS if name in kwargs}
+
+    with ChunkedWriter(file, **kwargs) as writer:
+
+        def leaf(child: Any) -> Iterable[str]:
+            html_bytes = getattr(type(child), "__html_bytes__", None)
+
+            if html_bytes is not None:
+                chunks = html_bytes(child, writer._encoding)
+                if chunks is not None:
+                    for data in chunks:
+                        writer.write_bytes(data)
+                    return ()
+
+            return _leaf_chunks(child)
+
+        write = writer.write
+        for chunk in iter_render(node, None if limits else leaf, **limits):
+            write(chunk)
+
+    return writer.bytes_written
@@ -0,0 +1,250 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Stream pages out of order, so slow parts don't hold up the rest.
+
+Usage
+-----
+
+>>> from concurrent.futures import ThreadPoolExecutor
+>>> from htbuilder import body, div, html, p
+>>> from htbuilder.streaming import Deferred, stream
+>>>
+>>> pool = ThreadPoolExecutor()
+>>>
+>>> page = html(body(
+...     div("Fast stuff"),
+...     Deferred(pool.submit(slow_recommendations), fallback=p("Loading...")),
+... ))
+>>>
+>>> for chunk in stream(page):
+...     response.write(chunk)
+
+The page is sent right away, with the fallback standing in for each Deferred
+child. As each one completes, its HTML is appended to the stream inside a
+`<template>`, together with a tiny inline script that swaps it in place of the
+fallback. No client-side framework needed.
+
+With asyncio, use awaitables (coroutines, tasks, futures) and astream():
+
+>>> page = div(Deferred(fetch_comments()))
+>>> async for chunk in astream(page):
+...     await response.write(chunk)
+
+Deferred subtrees may contain Deferred children of their own. Note that
+scripts inside deferred HTML won't run, since it's inserted from a template.
+When rendered with str(), a Deferred just waits for its result.
+
+Both functions take a `digest` that gets updated with the output as it's
+sent (see htbuilder.render.iter_render). Deferred children are sent in the
+order they complete, so the digest can differ between streams of the same
+page.
+
+htbuilder.hashing.fingerprint() doesn't wait for Deferred children. It hashes
+each one by its `key`, or by its fallback when there's no key, so to get an
+ETag that changes with what they resolve to, give them a key that does, like
+the version of the data they show:
+
+>>> Deferred(pool.submit(load_comments, post), key=f"comments-{post.version}")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import itertools
+
+from .render import _hash_chunks, _leaf_chunks, iter_render
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterable, Iterator
+
+_SWAP_FUNCTION = (
+    "function {prefix}Swap(i){{"
+    'var t=document.getElementById("{prefix}-t"+i),'
+    's=document.getElementById("{prefix}-s"+i);'
+    "s.replaceWith(t.content);t.remove()}}"
+)
+
+
+class Deferred:
+    def __init__(self, source: Any, fallback: Any = None, key: str | None = None):
+        """A child whose content comes from a future or awaitable.
+
+        Parameters
+        ----------
+        source : concurrent.futures.Future or awaitable
+            Resolves to the child to render: an HtmlElement, a string, etc.
+        fallback : any
+            What to show until the source resolves. Nothing by default.
+        key : str or None
+            Identifies what the source resolves to, for
+            htbuilder.hashing.fingerprint(). If None, the fallback is
+            fingerprinted instead.
+
+        """
+        self.source = source
+        self.fallback = fallback
+        self.key = key
+
+    def __html_fingerprint__(self) -> tuple[str, Any]:
+        """Return what htbuilder.hashing.fingerprint() hashes in our place."""
+        if self.key is None:
+            return "fallback", self.fallback
+        return "key", self.key
+
+    def __str__(self) -> str:
+        if not isinstance(self.source, concurrent.futures.Future):
+            raise TypeError("Awaitable Deferred children can only be rendered with astream()")
+
+        return "".join(iter_render(self.source.result()))
+
+
+class _Slots:
+    def __init__(self, prefix: str, nonce: str | None):
+        """Bookkeeping for the placeholders in one stream."""
+        self.prefix = prefix
+        self.script_open = f'<script nonce="{nonce}">' if nonce else "<script>"
+        self.pending: dict[Any, list[int]] = {}
+        self._ids = itertools.count()
+        self._sent_swap_function = False
+
+    def render(self, node: Any, to_key: Callable[[Any], Any]) -> Iterator[str]:
+        def leaf(child: Any) -> Iterable[str]:
+            if not isinstance(child, Deferred):
+                return _leaf_chunks(child)
+
+            slot = next(self._ids)
+            self.pending.setdefault(to_key(child.source), []).append(slot)
+            return self._placeholder(slot, child.fallback, leaf)
+
+        return iter_render(node, leaf)
+
+    def resolve(self, key: Any, result: Any, to_key: Callable[[Any], Any]) -> Iterator[str]:
+        if not self._sent_swap_function:
+            self._sent_swap_function = True
+            yield self.script_open
+            yield _SWAP_FUNCTION.format(prefix=self.prefix)
+            yield "</script>"
+
+        for slot in self.pending.pop(key):
+            yield f'<template id="{self.prefix}-t{slot}">'
+            yield from self.render(result, to_key)
+            yield "</template>"
+            yield f"{self.script_open}{self.prefix}Swap({slot})</script>"
+
+    def _placeholder(
+        self, slot: int, fallback: Any, leaf: Callable[[Any], Iterable[str]]
+    ) -> Iterator[str]:
+        yield f'<{self.prefix}-slot id="{self.prefix}-s{slot}">'
+        if fallback is not None:
+            yield from iter_render(fallback, leaf)
+        yield f"</{self.prefix}-slot>"
+
+
+def stream(
+    node: Any, prefix: str = "htb", nonce: str | None = None, digest: Any = None
+) -> Iterator[str]:
+    """Render `node`, sending Deferred children as they complete.
+
+    Parameters
+    ----------
+    node : HtmlElement
+        The page. Its Deferred children must wrap concurrent.futures.Future
+        objects.
+    prefix : str
+        Prefix for the ids, custom tag and function this adds to the page.
+        Change it if you stream more than one tree into the same page.
+    nonce : str or None
+        Nonce for the inline scripts, if your Content-Security-Policy needs it.
+    digest : hash object or None
+        Gets updated with the UTF-8 encoded output.
+
+    """
+    if digest is not None:
+        return _hash_chunks(_stream(node, prefix, nonce), digest)
+
+    return _stream(node, prefix, nonce)
+
+
+def _stream(node: Any, prefix: str, nonce: str | None) -> Iterator[str]:
+    slots = _Slots(prefix, nonce)
+
+    def to_key(source: Any) -> Any:
+        if not isinstance(source, concurrent.futures.Future):
+            raise TypeError("stream() needs futures, use astream() for awaitables")
+        return source
+
+    yield from slots.render(node, to_key)
+
+    while slots.pending:
+        done, _ = concurrent.futures.wait(
+            slots.pending, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            yield from slots.resolve(future, future.result(), to_key)
+
+
+async def astream(
+    node: Any, prefix: str = "htb", nonce: str | None = None, digest: Any = None
+) -> AsyncIterator[str]:
+    """Like stream(), but for Deferred children that wrap awaitables.
+
+    Plain concurrent.futures.Future objects work here too. If a Deferred
+    fails, or the stream is closed early (say, because the client went away),
+    the sources that are still pending get cancelled.
+    """
+    chunks = _astream(node, prefix, nonce)
+
+    try:
+        async for chunk in chunks:
+            if digest is not None:
+                digest.update(chunk.encode("utf-8"))
+            yield chunk
+    finally:
+        # Close it now, rather than whenever it gets garbage collected, so its
+        # tasks are cancelled right away.
+        await chunks.aclose()
+
+
+async def _astream(node: Any, prefix: str, nonce: str | None) -> AsyncGenerator[str, None]:
+    slots = _Slots(prefix, nonce)
+    tasks: dict[Any, asyncio.Future[Any]] = {}
+
+    def to_key(source: Any) -> Any:
+        # The same awaitable may appear more than once, but can only be
+        # awaited once.
+        if id(source) not in tasks:
+            if isinstance(source, concurrent.futures.Future):
+                tasks[id(source)] = asyncio.wrap_future(source)
+            else:
+                tasks[id(source)] = asyncio.ensure_future(source)
+        return tasks[id(source)]
+
+    try:
+        for chunk in slots.render(node, to_key):
+            yield chunk
+
+        while slots.pending:
+            done, _ = await asyncio.wait(slots.pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for chunk in slots.resolve(task, task.result(), to_key):
+                    yield chunk
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
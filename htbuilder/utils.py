@@ -12,15 +12,45 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import annotations
+
+# Cleaned class names. Same idea as htbuilder._clean_names: shared by all
+# threads without a lock, and bounded in case names are generated.
+_clean_classes: dict[str, str] = {}
+_MAX_CLEAN_CLASSES = 4096
+
+
+def _clean_class(name):
+    cleaned = _clean_classes.get(name)
+
+    if cleaned is None:
+        cleaned = name.replace("_", "-")
+        if len(_clean_classes) < _MAX_CLEAN_CLASSES:
+            _clean_classes[name] = cleaned
+
+    return cleaned
+
+
+def _keep(name):
+    return name
+
+
 def classes(*names, convert_underscores=True, **names_and_bools):
     """Join multiple class names with spaces between them.
 
+    Repeated names are only included once, and empty names, None and False
+    are skipped, so conditional classes can be written inline. Besides
+    names, you can pass iterables of names and dicts of {name: bool}.
+
     Example
     -------
 
     >>> classes("foo", "bar", baz=False, boz=True, long_name=True)
     "foo bar boz long-name"
 
+    >>> classes("foo", ["bar", "foo"], {"baz": True}, is_active and "active")
+    "foo bar baz"
+
     Or, if you want to keep the underscores:
 
     >>> classes("foo", "bar", long_name=True, convert_underscores=False)
@@ -28,19 +58,110 @@ def classes(*names, convert_underscores=True, **names_and_bools):
 
     """
     if convert_underscores:
-        def clean(name):
-            return name.replace("_", "-")
+        # Looking in the cache before calling _clean_class saves a call.
+        cached = _clean_classes.get
+        clean = _clean_class
     else:
-        def clean(name):
-            return name
-
-    classes = [clean(name) for name in names]
+        cached = clean = _keep
+
+    # dict keeps insertion order, so it dedupes while keeping the first one.
+    out = {}
+
+    for name in names:
+        if not name:
+            continue
+
+        if type(name) is str:
+            out[cached(name) or clean(name)] = None
+        elif isinstance(name, dict):
+            for key, include in name.items():
+                if include:
+                    out[clean(key)] = None
+        elif isinstance(name, str):
+            out[clean(name)] = None
+        else:
+            for item in name:
+                if item:
+                    out[clean(item)] = None
 
     for name, include in names_and_bools.items():
         if include:
-            classes.append(clean(name))
-
-    return " ".join(classes)
+            out[cached(name) or clean(name)] = None
+
+    return " ".join(out)
+
+
+class ClassSet:
+    # Most class strings to remember per ClassSet.
+    MAX_CACHED = 1024
+
+    def __init__(self, *always, convert_underscores=True, **flags):
+        """A precompiled set of classes, some of them conditional.
+
+        Calling it with flags returns the class string, which is computed
+        once per combination of flags and then cached.
+
+        Example
+        -------
+
+        >>> button = ClassSet("btn", primary=False, is_disabled=False)
+        >>>
+        >>> button()
+        "btn"
+        >>> button(primary=True, is_disabled=user.is_guest)
+        "btn primary is-disabled"
+
+        Flags passed to __init__ set their defaults. Passing an unknown flag
+        is a TypeError. str(button) gives the string for the defaults.
+
+        """
+        clean = _clean_class if convert_underscores else _keep
+
+        self._always = classes(*always, convert_underscores=convert_underscores).split()
+        self._names = [clean(name) for name in flags]
+        self._bits = {name: 1 << i for i, name in enumerate(flags)}
+        self._default_mask = sum(
+            bit for name, bit in self._bits.items() if flags[name]
+        )
+        self._cache = {}
+
+    def __call__(self, **flags):
+        mask = self._default_mask
+
+        if flags:
+            bits = self._bits
+            try:
+                for name, include in flags.items():
+                    if include:
+                        mask |= bits[name]
+                    else:
+                        mask &= ~bits[name]
+            except KeyError:
+                raise TypeError(f"Unknown class flag {name!r}") from None
+
+        try:
+            return self._cache[mask]
+        except KeyError:
+            pass
+
+        out = self._join(mask)
+        if len(self._cache) < self.MAX_CACHED:
+            self._cache[mask] = out
+
+        return out
+
+    def __str__(self):
+        return self()
+
+    def __repr__(self):
+        flags = ", ".join(
+            f"{name}={bool(self._default_mask & bit)}" for name, bit in self._bits.items()
+        )
+        return f"ClassSet({' '.join(self._always)!r}, {flags})"
+
+    def _join(self, mask):
+        names = [name for i, name in enumerate(self._names) if mask & (1 << i)]
+        return classes(self._always, names, convert_underscores=False)
 
 
 def styles(**rules):
@@ -0,0 +1,275 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Render a slice of an element's children, like one page of a huge table.
+
+Usage
+-----
+
+>>> from htbuilder import body, html, table, tbody, td, tr
+>>> from htbuilder.window import LazyChildren, render_window
+>>>
+>>> rows = tbody(id="rows")(tr(td(i)) for i in range(1000000))
+>>> page = html(body(table(rows)))
+>>>
+>>> render_window(rows, 500, 550)
+'<tbody id="rows"><tr><td>500</td></tr>...<tr><td>549</td></tr></tbody>'
+>>>
+>>> # Pass the root to wrap the slice in the ancestors' tags too:
+>>> render_window(rows, 500, 550, root=page)
+'<html><body><table><tbody id="rows"><tr><td>500</td></tr>...</table></body></html>'
+>>>
+>>> # Or, if you already have them, the ancestors themselves:
+>>> render_window(rows, 500, 550, ancestors=[page, page_body, page_table])
+>>>
+>>> # Children don't even have to exist until they're rendered:
+>>> lazy_rows = tbody(LazyChildren(lambda i: tr(td(db_rows[i])), len(db_rows)))
+>>> render_window(lazy_rows, 500, 550)
+
+Positions count the children as they're rendered: the children of fragments
+and every item of a LazyChildren count one by one. To find a window quickly
+when there are such children, each element keeps an index of where its
+children start, which is rebuilt after changes made through the normal
+element API. A LazyChildren's length must not change.
+
+Finding the ancestors of `target` searches the tree from `root`, stopping
+as soon as it finds `target`, and never looking inside `target` itself.
+Nothing about the tree is kept, so in a loop over the pages of a big tree,
+pass `ancestors` to skip the search altogether.
+"""
+
+from __future__ import annotations
+
+import weakref
+from bisect import bisect_right
+
+from . import HtmlElement, _tag_strings
+from .render import iter_render
+
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Iterator, Sequence
+
+
+class LazyChildren:
+    def __init__(self, getter: Callable[[int], Any], length: int):
+        """A run of `length` children, where child i is getter(i).
+
+        Children are only built when rendered, so only the ones in a window
+        are built by render_window().
+        """
+        self._getter = getter
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i: int) -> Any:
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("LazyChildren index out of range")
+        return self._getter(i)
+
+    # No __iter__ on purpose: elements would flatten this into a list.
+
+    def __html_chunks__(self) -> Iterator[str]:
+        for i in range(self._length):
+            yield from iter_render(self._getter(i))
+
+    def __str__(self) -> str:
+        return "".join(self.__html_chunks__())
+
+
+class _Offsets:
+    __slots__ = ("starts", "total", "dirty", "dependents", "__weakref__")
+
+    def __init__(self) -> None:
+        """Where each child of an element starts, counting rendered children."""
+        # None when every child counts as one, so positions are list indices.
+        self.starts: list[int] | None = None
+        self.total = 0
+        self.dirty = True
+        # Offsets of the parents of a fragment, which depend on its size.
+        self.dependents: weakref.WeakSet[_Offsets] = weakref.WeakSet()
+
+    # Called by HtmlElement when the element changes.
+    def _invalidate(self, element: HtmlElement | None = None) -> None:
+        self.dirty = True
+        for dependent in list(self.dependents):
+            dependent._invalidate()
+
+
+_offsets: weakref.WeakKeyDictionary[HtmlElement, _Offsets] = weakref.WeakKeyDictionary()
+
+
+def iter_window(
+    target: HtmlElement,
+    start: int,
+    stop: int,
+    root: HtmlElement | None = None,
+    ancestors: Sequence[HtmlElement] | None = None,
+) -> Iterator[str]:
+    """Yield the HTML for `target` with only children start..stop-1.
+
+    Parameters
+    ----------
+    target : HtmlElement
+        The element whose children to slice.
+    start, stop : int
+        The slice, like in a list: negative numbers count from the end, and
+        out-of-range ones are clipped.
+    root : HtmlElement or None
+        If given, the output is wrapped in the tags of the elements between
+        `root` (inclusive) and `target`.
+    ancestors : sequence of HtmlElement or None
+        Instead of `root`, the elements to wrap the output in, outermost
+        first. They're used as given, without checking they're really
+        `target`'s ancestors. Fragments among them are skipped.
+
+    """
+    if target._tag is None or target._cannot_have_children:
+        raise TypeError("Windows need an element that can have children")
+
+    if ancestors is not None:
+        if root is not None:
+            raise TypeError("Pass either root or ancestors, not both")
+        wrappers = list(ancestors)
+    elif root is None or root is target:
+        wrappers = []
+    else:
+        path = _find_ancestors(root, target)
+        if path is None:
+            raise ValueError("target is not in root's tree")
+        wrappers = path
+
+    wrappers.append(target)
+    ends = []
+
+    for element in wrappers:
+        if element._tag is None:
+            continue  # Fragments have no tags.
+        start_tag, end_tag = _tag_strings(element)
+        yield start_tag
+        ends.append(end_tag)
+
+    start, stop, _ = slice(start, stop).indices(_child_offsets(target).total)
+
+    for child in _window(target, start, stop):
+        yield from iter_render(child)
+
+    for end_tag in reversed(ends):
+        yield end_tag
+
+
+def render_window(
+    target: HtmlElement,
+    start: int,
+    stop: int,
+    root: HtmlElement | None = None,
+    ancestors: Sequence[HtmlElement] | None = None,
+) -> str:
+    """Like iter_window(), but returns a string."""
+    return "".join(iter_window(target, start, stop, root, ancestors))
+
+
+def child_count(element: HtmlElement) -> int:
+    """How many children `element` renders, counting like windows do."""
+    return _child_offsets(element).total
+
+
+def _find_ancestors(root: HtmlElement, target: HtmlElement) -> list[HtmlElement] | None:
+    """Return the elements from `root` down to `target`'s parent, or None."""
+    path = [root]
+    stack = [iter(root._children)]
+
+    while stack:
+        for child in stack[-1]:
+            if child is target:
+                return path
+            if isinstance(child, HtmlElement) and child._children:
+                path.append(child)
+                stack.append(iter(child._children))
+                break
+        else:
+            stack.pop()
+            path.pop()
+
+    return None
+
+
+def _window(element: HtmlElement, start: int, stop: int) -> Iterator[Any]:
+    """Yield the rendered children start..stop-1 of `element`."""
+    if start >= stop:
+        return
+
+    offsets = _child_offsets(element)
+    children = element._children
+
+    if offsets.starts is None:
+        yield from children[start:stop]
+        return
+
+    starts = offsets.starts
+    i = bisect_right(starts, start) - 1
+
+    while i < len(children) and starts[i] < stop:
+        child = children[i]
+        local_start = max(start - starts[i], 0)
+        local_stop = stop - starts[i]
+
+        if isinstance(child, HtmlElement) and child._tag is None:
+            yield from _window(child, local_start, local_stop)
+        elif isinstance(child, LazyChildren):
+            for j in range(local_start, min(local_stop, len(child))):
+                yield child._getter(j)
+        else:
+            yield child
+
+        i += 1
+
+
+def _child_offsets(element: HtmlElement) -> _Offsets:
+    offsets = _offsets.get(element)
+
+    if offsets is None:
+        offsets = _offsets[element] = _Offsets()
+        element._add_observer(weakref.ref(offsets))
+
+    if offsets.dirty:
+        starts = []
+        total = 0
+        flat = True
+
+        for child in element._children:
+            starts.append(total)
+            if isinstance(child, HtmlElement) and child._tag is None:
+                child_offsets = _child_offsets(child)
+                child_offsets.dependents.add(offsets)
+                total += child_offsets.total
+                flat = False
+            elif isinstance(child, LazyChildren):
+                total += len(child)
+                flat = False
+            else:
+                total += 1
+
+        offsets.starts = None if flat else starts
+        offsets.total = total
+        offsets.dirty = False
+
+    return offsets
+
@@ -0,0 +1,111 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from htbuilder import HtmlElement, div, fragment, img, li, my_element, span, ul
+from htbuilder.binary import dump, dumps, load_mmap, loads, render
+
+
+def _tree():
+    return div(id="container", _class="a b")(
+        ul(_class="list")(li(_class="item")(f"Item {i} ✓", 1.5) for i in range(50)),
+        img(src="foo.png"),
+        fragment("plain ", span("text")),
+        my_element(data_foo="bar"),
+        HtmlElement("IMG"),
+    )
+
+
+class TestBinary(unittest.TestCase):
+    def test_round_trip(self):
+        tree = _tree()
+        data = dumps(tree)
+        loaded = loads(data)
+
+        self.assertEqual(str(loaded), str(tree))
+        self.assertEqual(loaded.id, "container")
+        self.assertEqual(loaded._children[3]._tag, "my_element")
+        self.assertEqual(loaded._children[3].data_foo, "bar")
+
+        # Loaded elements behave like freshly built ones.
+        loaded(span("more"))
+        loaded.title = "hi"
+        self.assertTrue(str(loaded).endswith("<span>more</span></div>"))
+
+    def test_render_without_loading(self):
+        tree = _tree()
+        self.assertEqual(render(dumps(tree)), str(tree))
+        self.assertEqual(render(dumps("just text")), "just text")
+        self.assertEqual(render(dumps(fragment())), "")
+
+    def test_interning(self):
+        tree = ul(li(_class="item")("x") for _ in range(100))
+        data = dumps(tree)
+
+        self.assertEqual(data.count(b"item"), 1)
+        self.assertLess(len(data), len(pickle.dumps(tree)) / 2)
+
+    def test_bad_data(self):
+        with self.assertRaises(ValueError):
+            loads(b"<div></div>")
+
+    def test_mmap(self):
+        tree = _tree()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.htb")
+            with open(path, "wb") as f:
+                dump(tree, f)
+
+            with load_mmap(path) as mapped:
+                self.assertEqual(mapped.render(), str(tree))
+                self.assertEqual(str(mapped.to_element()), str(tree))
+
+    def test_mmap_close_with_live_chunks(self):
+        tree = _tree()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.htb")
+            with open(path, "wb") as f:
+                dump(tree, f)
+
+            with load_mmap(path) as mapped:
+                chunks = mapped.iter_render()
+                kept = [next(chunks) for _ in range(5)]
+
+            # Closing didn't fail, and what we got is still readable.
+            self.assertTrue(str(tree).startswith(b"".join(kept).decode()))
+            self.assertEqual(list(chunks), [])
+
+    def test_truncated_data(self):
+        data = dumps(_tree())
+
+        for size in (len(data) // 2, len(data) - 1, 5):
+            with self.assertRaises(ValueError):
+                loads(data[:size])
+            with self.assertRaises(ValueError):
+                render(data[:size])
+
+    def test_pickle(self):
+        tree = _tree()
+        self.assertEqual(str(pickle.loads(pickle.dumps(tree))), str(tree))
+        self.assertEqual(str(pickle.loads(pickle.dumps(fragment("x")))), "x")
+
+
+if __name__ == "__main__":
+    unittest.main()
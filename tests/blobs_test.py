@@ -0,0 +1,131 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import io
+import mmap
+import os
+import tempfile
+import unittest
+
+from htbuilder import div, pre, script
+from htbuilder.blobs import BufferText, FileText, _Blob
+from htbuilder.render import iter_render, render, render_to_file
+from htbuilder.streaming import stream
+
+TEXT = "é</script> a&b <x> ✓ " * 1000
+
+
+class _RecordingFile(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return super().write(data)
+
+
+class TestBlobs(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "blob.txt")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(TEXT)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_str(self):
+        self.assertEqual(str(FileText(self.path)), TEXT)
+        self.assertEqual(str(BufferText(TEXT.encode())), TEXT)
+        self.assertEqual(str(div(BufferText(b"hi"))), "<div>hi</div>")
+
+    def test_escaping(self):
+        text = "a</b <c> & </"
+        self.assertEqual(str(BufferText(text.encode(), escape=True)), "a&lt;/b &lt;c&gt; &amp; &lt;/")
+        self.assertEqual(str(BufferText(text.encode(), escape="script")), "a<\\/b <c> & <\\/")
+
+        with self.assertRaises(ValueError):
+            BufferText(b"", escape="css")
+
+    def test_chunk_boundaries(self):
+        # Small chunks split both "</" and multi-byte characters.
+        for chunk_size in (1, 2, 3, 7):
+            for escape in (False, True, "script"):
+                blob = FileText(self.path, escape=escape, chunk_size=chunk_size)
+                full = BufferText(TEXT.encode(), escape=escape)
+                self.assertEqual("".join(blob.__html_chunks__()), str(full))
+                self.assertEqual(
+                    b"".join(blob.__html_bytes__("utf-8")), str(full).encode()
+                )
+
+    def test_iter_render_in_chunks(self):
+        blob = FileText(self.path, chunk_size=1024)
+        chunks = list(iter_render(pre(blob)))
+
+        self.assertEqual("".join(chunks), f"<pre>{TEXT}</pre>")
+        self.assertLessEqual(max(len(c) for c in chunks), 1024)
+        self.assertEqual(render(pre(blob), max_chars=10**6), f"<pre>{TEXT}</pre>")
+
+    def test_render_to_file_copies_bytes(self):
+        blob = FileText(self.path, escape="script", chunk_size=1024)
+        tree = script(blob)
+        out = _RecordingFile()
+
+        render_to_file(tree, out, buffer_size=10)
+
+        self.assertEqual(out.getvalue(), str(tree).encode())
+        # Escaping makes chunks a bit longer, but they're never joined up.
+        self.assertLess(max(map(len, out.writes)), 2 * 1024)
+
+    def test_render_to_file_other_encoding(self):
+        tree = pre(BufferText(TEXT.encode(), escape=True))
+        out = io.BytesIO()
+        render_to_file(tree, out, encoding="utf-16")
+        self.assertEqual(out.getvalue().decode("utf-16").replace("﻿", ""), str(tree))
+
+        latin = BufferText("café <b>".encode("latin-1"), encoding="latin-1", escape=True)
+        out = io.BytesIO()
+        render_to_file(pre(latin), out)
+        self.assertEqual(out.getvalue().decode(), "<pre>café &lt;b&gt;</pre>")
+
+    def test_render_to_file_compressed(self):
+        tree = div("before", FileText(self.path), "after")
+        out = io.BytesIO()
+        render_to_file(tree, out, compression="gzip")
+        self.assertEqual(gzip.decompress(out.getvalue()).decode(), str(tree))
+
+    def test_mmap(self):
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            tree = pre(BufferText(m, escape=True, chunk_size=100))
+            out = io.BytesIO()
+            render_to_file(tree, out)
+
+        self.assertEqual(out.getvalue().decode(), str(pre(BufferText(TEXT.encode(), escape=True))))
+
+    def test_stream(self):
+        tree = div(BufferText(b"<b>bold</b>"))
+        self.assertEqual("".join(stream(tree)), "<div><b>bold</b></div>")
+
+    def test_blobs_must_read_data(self):
+        class NoData(_Blob):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoData()
+
+
+if __name__ == "__main__":
+    unittest.main()
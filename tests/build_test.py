@@ -0,0 +1,140 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from htbuilder import body, h1, html, li, ul
+from htbuilder.build import build, main
+
+# Changed by tests to simulate edits between builds.
+TITLES = {}
+CALLS = []
+
+
+def page(name):
+    CALLS.append(name)
+    return html(body(h1(TITLES.get(name, name)), ul(li(i) for i in range(3))))
+
+
+def broken():
+    raise ValueError("broken page")
+
+
+def pages(names, dep=None):
+    return {
+        f"{name}.html": (functools.partial(page, name), dep) if dep else functools.partial(page, name)
+        for name in names
+    }
+
+
+PAGES = pages(["a", "b"])
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        TITLES.clear()
+        CALLS.clear()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read(self, path):
+        with open(os.path.join(self.out, path), encoding="utf-8") as f:
+            return f.read()
+
+    def test_writes_pages(self):
+        result = build(pages(["a", "sub/b"]), self.out, workers=0)
+
+        self.assertEqual(sorted(result.written), ["a.html", "sub/b.html"])
+        self.assertEqual(self.read("sub/b.html"), str(page("sub/b")))
+
+    def test_incremental(self):
+        build(pages(["a", "b", "c"]), self.out, workers=0)
+        mtime = os.stat(os.path.join(self.out, "a.html")).st_mtime_ns
+
+        TITLES["b"] = "New title"
+        result = build(pages(["a", "b", "c"]), self.out, workers=0)
+
+        self.assertEqual(result.written, ["b.html"])
+        self.assertEqual(sorted(result.unchanged), ["a.html", "c.html"])
+        self.assertIn("New title", self.read("b.html"))
+        self.assertEqual(os.stat(os.path.join(self.out, "a.html")).st_mtime_ns, mtime)
+
+        result = build(pages(["a", "b", "c"]), self.out, workers=0, force=True)
+        self.assertEqual(len(result.written), 3)
+
+    def test_dependency_keys(self):
+        build(pages(["a", "b"], dep="v1"), self.out, workers=0)
+        CALLS.clear()
+
+        result = build(pages(["a", "b"], dep="v1"), self.out, workers=0)
+        self.assertEqual(sorted(result.skipped), ["a.html", "b.html"])
+        self.assertEqual(CALLS, [])
+
+        result = build(pages(["a", "b"], dep="v2"), self.out, workers=0)
+        self.assertEqual(result.skipped, [])
+        self.assertEqual(sorted(CALLS), ["a", "b"])
+
+    def test_deleted_output_is_rebuilt(self):
+        build(pages(["a"]), self.out, workers=0)
+        os.remove(os.path.join(self.out, "a.html"))
+
+        result = build(pages(["a"]), self.out, workers=0)
+        self.assertEqual(result.written, ["a.html"])
+
+    def test_process_pool(self):
+        names = [f"p{i}" for i in range(100)]
+        result = build(pages(names), self.out, workers=2)
+
+        self.assertEqual(len(result.written), 100)
+        self.assertEqual(self.read("p42.html"), str(page("p42")))
+
+    def test_failure_keeps_finished_pages(self):
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                names = [f"p{i}" for i in range(100)]
+                site = pages(names)
+                site["broken.html"] = broken
+
+                with self.assertRaises(ValueError):
+                    build(site, self.out, workers=workers)
+
+                del site["broken.html"]
+                result = build(site, self.out, workers=workers)
+                self.assertGreater(len(result.unchanged), 0)
+                self.assertEqual(len(result.written) + len(result.unchanged), 100)
+
+                build(site, self.out, workers=workers, force=True)
+
+    def test_cli(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            main(["tests.build_test:PAGES", self.out, "-j", "0"])
+            main(["tests.build_test", self.out, "-j", "0"])
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["2 written, 0 unchanged, 0 skipped", "0 written, 2 unchanged, 0 skipped"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from htbuilder import circle, g, path
+from htbuilder.charts import circles, path_d, points
+
+
+class _FakeArray:
+    """Just enough of a NumPy array for the charts module."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def tolist(self):
+        return [list(row) if isinstance(row, tuple) else row for row in self._data]
+
+    def ravel(self):
+        return _FakeArray([c for row in self._data for c in row])
+
+
+class TestCharts(unittest.TestCase):
+    def test_path_d(self):
+        self.assertEqual(path_d([(0, 0), (1.5, 2.25), (3, 4.001)]), "M0 0 1.5 2.25 3 4")
+        self.assertEqual(path_d([0, 1], [2, 3], closed=True), "M0 2 1 3Z")
+        self.assertEqual(path_d([]), "")
+
+    def test_points(self):
+        self.assertEqual(points([0, 1.1, 2], [5, 6, 100.5]), "0,5 1.1,6 2,100.5")
+        self.assertEqual(points([(10, 20.05)], precision=1), "10,20.1")
+        self.assertEqual(points([(0.1, 2.0)], precision=None), "0.1,2")
+        self.assertEqual(points([(100.4, 7.6)], precision=0), "100,8")
+
+    def test_circles(self):
+        dots = circles([1, 2], [3, 4.5], r=2.50, _class="dot")
+        expected = "".join(
+            str(circle(cx=x, cy=y, r="2.5", _class="dot")) for x, y in [(1, 3), (2, 4.5)]
+        )
+        self.assertEqual(dots, expected)
+
+        self.assertEqual(
+            circles([(1, 2), (3, 4)], r=[5, 6]),
+            '<circle cx="1" cy="2" r="5"/><circle cx="3" cy="4" r="6"/>',
+        )
+
+        # Fits in as a child like any other string.
+        chart = g(fill="red")(circles([(0, 0)]))
+        self.assertEqual(str(chart), '<g fill="red"><circle cx="0" cy="0" r="1"/></g>')
+
+    def test_line_decimation(self):
+        xs = list(range(10))
+        self.assertEqual(path_d(xs, [0] * 10, tolerance=3), "M0 0 3 0 6 0 9 0")
+        self.assertEqual(points(xs[:2], [0, 0], tolerance=3), "0,0 1,0")
+
+    def test_grid_decimation(self):
+        out = circles([(1, 2), (1.1, 2.1), (5, 5)], r=[1, 2, 3], tolerance=1)
+        self.assertEqual(out, '<circle cx="1" cy="2" r="1"/><circle cx="5" cy="5" r="3"/>')
+
+        out = circles([(0.1, 0.1), (0.2, 0.2), (1.5, 0.1)], tolerance=1)
+        self.assertEqual(out.count("<circle"), 2)
+
+    def test_array_input(self):
+        pairs = _FakeArray([(0, 1), (2, 3)])
+        self.assertEqual(path_d(pairs), "M0 1 2 3")
+        self.assertEqual(points(pairs, tolerance=0.5), "0,1 2,3")
+        self.assertEqual(points(_FakeArray([0, 2]), _FakeArray([1, 3])), "0,1 2,3")
+        self.assertEqual(circles(pairs, r=_FakeArray([1, 2])).count("<circle"), 2)
+
+    def test_matches_element_attrs(self):
+        d = path_d([(0.5, 1), (2, 3)])
+        self.assertEqual(str(path(d=d)), '<path d="M0.5 1 2 3"/>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+from htbuilder import component, div, img, span
+from htbuilder.components import Rendered
+from htbuilder.render import iter_render
+
+
+class TestComponents(unittest.TestCase):
+    def test_caches_by_arguments(self):
+        calls = []
+
+        @component
+        def chip(name, avatar=None):
+            calls.append(name)
+            return span(_class="chip")(img(src=avatar), name)
+
+        first = chip("Ada", avatar="/ada.png")
+        second = chip("Ada", avatar="/ada.png")
+        chip("Grace", avatar="/grace.png")
+
+        self.assertIsInstance(first, Rendered)
+        self.assertIs(first, second)
+        self.assertEqual(first, '<span class="chip"><img src="/ada.png"/>Ada</span>')
+        self.assertEqual(calls, ["Ada", "Grace"])
+
+        info = chip.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+        self.assertAlmostEqual(info.hit_rate, 1 / 3)
+
+    def test_keys_are_unambiguous(self):
+        @component
+        def chip(*args, **kwargs):
+            return span(*args, **kwargs)
+
+        self.assertEqual(chip(x=1), '<span x="1"></span>')
+        self.assertEqual(chip((), (("x", 1),)), "<span>x1</span>")
+        self.assertEqual(chip(1), "<span>1</span>")
+        self.assertEqual(chip(True), "<span>True</span>")
+        self.assertEqual(chip((1,)), "<span>1</span>")
+        self.assertEqual(chip((1.0,)), "<span>1.0</span>")
+        self.assertEqual(chip.cache_info().hits, 0)
+
+    def test_used_as_child(self):
+        @component(maxsize=10)
+        def icon(name):
+            return span(_class=f"icon-{name}")
+
+        dom = div(icon("star"), icon("star"))
+        expected = '<div><span class="icon-star"></span><span class="icon-star"></span></div>'
+
+        self.assertEqual(str(dom), expected)
+        self.assertEqual("".join(iter_render(dom)), expected)
+        self.assertEqual(icon.__name__, "icon")
+
+    def test_lru(self):
+        @component(maxsize=2)
+        def item(i):
+            return span(i)
+
+        item(1)
+        item(2)
+        item(1)
+        item(3)  # Evicts 2, the least recently used.
+
+        self.assertEqual(item.cache_info().currsize, 2)
+        item(1)
+        self.assertEqual(item.cache_info().hits, 2)
+        item(2)
+        self.assertEqual(item.cache_info().misses, 4)
+
+    def test_ttl(self):
+        @component(ttl=10)
+        def clock(label):
+            return span(label)
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            clock("a")
+            clock("a")
+        with mock.patch("time.monotonic", return_value=120.0):
+            clock("a")
+
+        info = clock.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+
+    def test_unhashable_arguments(self):
+        @component
+        def items(values):
+            return div(span(v) for v in values)
+
+        self.assertEqual(items([1, 2]), "<div><span>1</span><span>2</span></div>")
+        self.assertEqual(items.cache_info().currsize, 0)
+
+    def test_uncached_and_clear(self):
+        @component
+        def box(text):
+            return div(text)
+
+        box("x")
+        tree = box.uncached("x")
+        tree(id="mutable")
+        self.assertEqual(str(tree), '<div id="mutable">x</div>')
+
+        box.cache_clear()
+        self.assertEqual(box.cache_info(), (0, 0, 256, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import unittest
+from concurrent.futures import Future
+
+from htbuilder import div, fragment, img, li, span, ul
+from htbuilder.blobs import BufferText
+from htbuilder.hashing import fingerprint
+from htbuilder.streaming import Deferred
+
+
+def _page(title="Title", n=3):
+    return div(id="page")(span(title), ul(li(i) for i in range(n)), img(src="x.png"))
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_stable(self):
+        self.assertEqual(fingerprint(_page()), fingerprint(_page()))
+        self.assertEqual(len(fingerprint(_page())), 32)
+
+    def test_changes(self):
+        base = fingerprint(_page())
+
+        self.assertNotEqual(fingerprint(_page(title="Other")), base)
+        self.assertNotEqual(fingerprint(_page(n=4)), base)
+        self.assertNotEqual(fingerprint(_page()(_class="x")), base)
+
+    def test_no_ambiguity(self):
+        # Same text, in different places.
+        self.assertNotEqual(fingerprint(div(span("a"), "b")), fingerprint(div(span("a", "b"))))
+        self.assertNotEqual(fingerprint(div("ab", "c")), fingerprint(div("a", "bc")))
+        self.assertNotEqual(fingerprint(div(title="a b")), fingerprint(div(title="a", b="")))
+        self.assertNotEqual(fingerprint(div()), fingerprint(fragment()))
+
+    def test_digest(self):
+        tree = _page()
+        self.assertEqual(len(fingerprint(tree, hashlib.sha256())), 64)
+
+    def test_other_children(self):
+        self.assertNotEqual(
+            fingerprint(div(BufferText(b"one"))), fingerprint(div(BufferText(b"two")))
+        )
+        self.assertEqual(fingerprint(div(1.5)), fingerprint(div(1.5)))
+
+    def test_deep_tree(self):
+        tree = inner = div()
+        for _ in range(5000):
+            child = div()
+            inner(child)
+            inner = child
+
+        self.assertEqual(len(fingerprint(tree)), 32)
+
+    def test_deferred(self):
+        async def coro():
+            return "x"
+
+        awaitable = coro()
+        pending = Future()
+
+        # Neither waits for the source.
+        by_fallback = fingerprint(div(Deferred(awaitable, fallback=span("Loading"))))
+        self.assertEqual(
+            fingerprint(div(Deferred(pending, fallback=span("Loading")))), by_fallback
+        )
+        awaitable.close()
+
+        self.assertNotEqual(fingerprint(div(Deferred(pending, fallback="..."))), by_fallback)
+        self.assertNotEqual(
+            fingerprint(div(Deferred(pending), "x")),
+            fingerprint(div(Deferred(pending, fallback="x"))),
+        )
+
+        by_key = fingerprint(div(Deferred(pending, key="v1")))
+        self.assertEqual(fingerprint(div(Deferred(Future(), key="v1"))), by_key)
+        self.assertNotEqual(fingerprint(div(Deferred(pending, key="v2"))), by_key)
+        self.assertNotEqual(fingerprint(div(Deferred(pending, fallback="v1"))), by_key)
+        self.assertFalse(pending.done())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -466,6 +466,97 @@ class TestHtBuilder(unittest.TestCase):
         """),
         )
 
+    def test_clone(self):
+        base = div(id="page")(h1("Title"), ul(li("one")))
+        copy = base.clone()
+
+        # Nothing is copied until something changes.
+        self.assertIs(copy._children, base._children)
+        self.assertIs(copy._attrs, base._attrs)
+
+        copy(span("extra"))
+        copy.id = "variant"
+        del copy.id
+        base(foo="bar")
+
+        self.assertEqual(
+            str(base),
+            '<div id="page" foo="bar"><h1>Title</h1><ul><li>one</li></ul></div>',
+        )
+        self.assertEqual(
+            str(copy),
+            "<div><h1>Title</h1><ul><li>one</li></ul><span>extra</span></div>",
+        )
+
+        # The untouched subtree is still shared.
+        self.assertIs(copy._children[1], base._children[1])
+
+    def test_clone_of_clone(self):
+        base = div("a")
+        first = base.clone()
+        second = first.clone()
+        first("b")
+        second("c")
+
+        self.assertEqual(str(base), "<div>a</div>")
+        self.assertEqual(str(first), "<div>ab</div>")
+        self.assertEqual(str(second), "<div>ac</div>")
+
+    def test_clone_descendants_via_query(self):
+        from htbuilder.query import select_one
+
+        base = div(ul(li(id="first")("one")))
+        copy = base.clone()
+
+        select_one(copy, "#first")("!")
+        select_one(copy, "ul")(li("two"))
+
+        self.assertEqual(str(base), '<div><ul><li id="first">one</li></ul></div>')
+        self.assertEqual(
+            str(copy), '<div><ul><li id="first">one!</li><li>two</li></ul></div>'
+        )
+
+    def test_clone_original_via_query(self):
+        from htbuilder.query import select_one
+
+        base = div(ul(li(id="first")("one")))
+        copy = base.clone()
+
+        select_one(base, "#first")("!")
+
+        self.assertEqual(str(base), '<div><ul><li id="first">one!</li></ul></div>')
+        self.assertEqual(str(copy), '<div><ul><li id="first">one</li></ul></div>')
+
+    def test_clone_copies_lazily(self):
+        from htbuilder.query import select, select_one
+
+        base = div(ul(li(id=f"i{i}")(i) for i in range(1000)), span(id="text"))
+        copy = base.clone()
+
+        select_one(copy, "#i5")("!")
+        select_one(copy, "#text")("!")
+
+        base_items = base._children[0]._children
+        copy_items = copy._children[0]._children
+        shared = sum(a is b for a, b in zip(base_items, copy_items))
+        self.assertEqual(shared, 999)
+        self.assertEqual(str(select_one(base, "#i5")), '<li id="i5">5</li>')
+        self.assertEqual(str(select_one(copy, "#i5")), '<li id="i5">5!</li>')
+
+        # Asking for every item gives copies of all of them.
+        for item in select(copy, "li"):
+            item(_class="mine")
+        self.assertNotIn("mine", str(base))
+        self.assertEqual(str(copy).count("mine"), 1000)
+
+    def test_clone_fragment(self):
+        base = fragment(span("x"))
+        copy = base.clone()
+        copy("y")
+
+        self.assertEqual(str(base), "<span>x</span>")
+        self.assertEqual(str(copy), "<span>x</span>y")
+
     def test_repr_html(self):
         dom = div("Exists!")
         self.assertEqual(
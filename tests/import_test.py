@@ -0,0 +1,110 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+import types
+import unittest
+
+import htbuilder
+
+# Generous on purpose: this guards against regressions like pulling in typing
+# or every submodule at import time, not against a slow CI box.
+MAX_IMPORT_MICROSECONDS = 20000
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestImport(unittest.TestCase):
+    def test_submodules_are_lazy(self):
+        out = _run(
+            "import sys, htbuilder\n"
+            "print(sorted(m for m in sys.modules if m.startswith('htbuilder')))\n"
+            "print('typing' in sys.modules)\n"
+        )
+        modules, typing_loaded = out.stdout.splitlines()
+        self.assertEqual(modules, "['htbuilder']")
+        self.assertEqual(typing_loaded, "False")
+
+    def test_lazy_helpers(self):
+        from htbuilder import classes, func, styles, unit
+
+        self.assertEqual(classes("a", b=True), "a b")
+        self.assertEqual(func.rgb(1, 2, 3), "rgb(1,2,3)")
+        self.assertEqual(unit.px(1), ("1px",))
+        self.assertEqual(styles(color="red"), "color:red")
+
+    def test_standard_tags_are_attributes(self):
+        module_dict = vars(htbuilder)
+        for tag in ("div", "span", "svg", "circle", "fragment"):
+            self.assertIn(tag, module_dict)
+
+        # These would shadow builtins, so they're looked up dynamically.
+        self.assertNotIn("input", module_dict)
+        self.assertEqual(str(htbuilder.input(type="text")), '<input type="text"/>')
+
+    def test_submodules(self):
+        from htbuilder import funcs, parser, render, units, utils
+
+        for module in (funcs, parser, render, units, utils):
+            self.assertIsInstance(module, types.ModuleType)
+
+        out = _run(
+            "from htbuilder import utils\n"
+            "print(type(utils).__name__)\n"
+        )
+        self.assertEqual(out.stdout.strip(), "module")
+
+    def test_star_import(self):
+        namespace = {}
+        exec("from htbuilder import *", namespace)
+
+        self.assertIn("HtmlElement", namespace)
+        self.assertIn("styles", namespace)
+        self.assertNotIn("time", namespace)
+        self.assertNotIn("div", namespace)
+
+    def test_tags_are_read_only(self):
+        with self.assertRaises(AttributeError):
+            htbuilder.div._tag = "span"
+        self.assertEqual(str(htbuilder.div()), "<div></div>")
+
+    def test_dunders_are_not_tags(self):
+        with self.assertRaises(AttributeError):
+            htbuilder.__path_hooks__
+
+    def test_import_time(self):
+        out = _run("import htbuilder")
+
+        # Lines look like "import time:   self |  cumulative | module".
+        for line in out.stderr.splitlines():
+            fields = [f.strip() for f in line.split("|")]
+            if fields[-1] == "htbuilder":
+                cumulative = int(fields[1])
+                break
+        else:
+            self.fail("htbuilder missing from -X importtime output")
+
+        self.assertLess(cumulative, MAX_IMPORT_MICROSECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
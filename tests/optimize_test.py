@@ -0,0 +1,165 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import threading
+import unittest
+
+from htbuilder import HtmlElement, div, fragment, img, li, span, ul
+from htbuilder.optimize import normalize_on_insert, optimize
+from htbuilder.query import select
+from htbuilder.render import render
+
+
+class _Leaf:
+    def __str__(self):
+        return "<leaf/>"
+
+
+def _items(n):
+    return ul(_class="list")(fragment(li("Item ", i), "\n", "") for i in range(n))
+
+
+class TestOptimize(unittest.TestCase):
+    def test_same_html(self):
+        tree = _items(10)
+        expected = str(tree)
+
+        self.assertIs(optimize(tree), tree)
+        self.assertEqual(str(tree), expected)
+        self.assertEqual(len(tree._children), 20)
+
+        li_children = tree._children[0]._children
+        self.assertEqual(li_children, ["Item 0"])
+
+    def test_drops_none_and_empty(self):
+        tree = div("", None, "a", fragment(None, 1, 2.5), "b")
+        optimize(tree)
+        self.assertEqual(tree._children, ["a12.5b"])
+
+    def test_keeps_other_children(self):
+        leaf = _Leaf()
+        tree = div("a", "b", leaf, "c", fragment("d"))
+        optimize(tree)
+        self.assertEqual(tree._children, ["ab", leaf, "cd"])
+
+    def test_root_fragment(self):
+        tree = fragment(fragment("a", fragment("b")), span("c"))
+        expected = str(tree)
+        optimize(tree)
+        self.assertEqual(len(tree._children), 2)
+        self.assertEqual(str(tree), expected)
+
+    def test_prerender(self):
+        leaf = _Leaf()
+        tree = div(ul(li(i) for i in range(3)), img(src="x.png"), div(leaf, span("s")))
+        expected = str(tree)
+        optimize(tree, prerender=True)
+
+        self.assertEqual(str(tree), expected)
+        self.assertEqual(len(tree._children), 2)
+        self.assertEqual(tree._children[0], '<ul><li>0</li><li>1</li><li>2</li></ul><img src="x.png"/>')
+
+        inner = tree._children[1]
+        self.assertEqual(inner._children, [leaf, "<span>s</span>"])
+
+    def test_deep_tree(self):
+        tree = inner = div()
+        for _ in range(5000):
+            child = fragment(div())
+            inner(child)
+            inner = child._children[0]
+        inner("bottom")
+
+        expected = render(tree)
+        optimize(tree)
+        self.assertEqual(render(tree), expected)
+        self.assertEqual(tree._children[0]._tag, "div")
+
+    def test_clone_is_not_touched(self):
+        template = _items(3)
+        expected = str(template)
+        copy = template.clone()
+
+        optimize(copy, prerender=True)
+
+        self.assertEqual(len(template._children), 3)
+        self.assertEqual(str(template), expected)
+        self.assertEqual(str(copy), expected)
+
+    def test_updates_query_index(self):
+        tree = div(fragment(span(_class="x")))
+        self.assertEqual(len(select(tree, "div > .x")), 1)
+
+        optimize(tree, prerender=True)
+        self.assertEqual(select(tree, "div > .x"), [])
+
+
+class TestNormalizeOnInsert(unittest.TestCase):
+    def test_insert(self):
+        with normalize_on_insert():
+            tree = div("a", None, "", fragment("b", fragment(span(), 1)))
+        self.assertEqual(len(tree._children), 3)
+        self.assertEqual(tree._children[0], "ab")
+
+        # Still normalizes after the block.
+        tree("c", 2)
+        self.assertEqual(tree._children[-1], "1c2")
+        self.assertEqual(str(tree), "<div>ab<span></span>1c2</div>")
+
+    def test_scoped(self):
+        outside = div("a")
+        with normalize_on_insert():
+            inside = div("a", "b")
+            with normalize_on_insert(False):
+                plain = div("a", "b")
+            outside("b")
+
+        self.assertEqual(inside._children, ["ab"])
+        self.assertEqual(plain._children, ["a", "b"])
+        self.assertEqual(outside._children, ["a", "b"])
+        self.assertEqual(div("a", "b")._children, ["a", "b"])
+        self.assertIsNone(HtmlElement._on_insert)
+
+    def test_other_threads(self):
+        results = []
+        started, done = threading.Event(), threading.Event()
+
+        def build():
+            started.wait()
+            results.append(div("a", "b")._children)
+            done.set()
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        with normalize_on_insert():
+            started.set()
+            done.wait()
+        thread.join()
+
+        self.assertEqual(results, [["a", "b"]])
+
+    def test_clone_and_pickle(self):
+        with normalize_on_insert():
+            tree = div("a")
+        copy = tree.clone()
+        copy("b")
+        self.assertEqual(copy._children, ["ab"])
+
+        restored = pickle.loads(pickle.dumps(tree))
+        restored("c")
+        self.assertEqual(restored._children, ["ac"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import unittest
+
+from htbuilder import HtmlElement, div
+from htbuilder.parser import TreeBuilder, iterparse, parse
+
+
+class TestParser(unittest.TestCase):
+    def test_round_trip(self):
+        markup = (
+            '<div id="main" class="a b"><h1>Title</h1>'
+            "<p>Hello <b>world</b> &amp; &#169; friends</p>"
+            "<!-- comment --><script>if (a < b) {}</script></div>"
+        )
+        self.assertEqual(str(parse(markup)), markup)
+
+    def test_builds_elements(self):
+        dom = parse('<div id="main" data-foo="bar"><span>hi</span></div>')
+        main = dom._children[0]
+
+        self.assertIsInstance(main, HtmlElement)
+        self.assertEqual(main._tag, "div")
+        self.assertEqual(main.id, "main")
+        self.assertEqual(main.data_foo, "bar")
+
+        main(_class="extra")
+        self.assertEqual(
+            str(dom),
+            '<div id="main" data-foo="bar" class="extra"><span>hi</span></div>',
+        )
+
+    def test_empty_elements(self):
+        dom = parse('<p>a<br>b<img src="x.png">c</p>')
+        p = dom._children[0]
+
+        self.assertEqual(len(p._children), 5)
+        self.assertTrue(p._children[1]._cannot_have_children)
+        self.assertEqual(str(dom), '<p>a<br/>b<img src="x.png"/>c</p>')
+
+    def test_attribute_values(self):
+        dom = parse('<input disabled value="say &quot;hi&quot; &amp; bye">')
+        self.assertEqual(
+            str(dom),
+            '<input disabled="" value="say &quot;hi&quot; &amp; bye"/>',
+        )
+
+    def test_unclosed_and_stray_tags(self):
+        dom = parse("<ul><li>one</li><li>two</ul></span>after")
+        self.assertEqual(str(dom), "<ul><li>one</li><li>two</li></ul>after")
+
+    def test_raw_depth(self):
+        markup = '<div id="a"><p class=x>Hello <b>you</b></p><br></div>'
+        dom = parse(markup, raw_depth=1)
+        outer = dom._children[0]
+
+        self.assertEqual(outer._children, ['<p class=x>Hello <b>you</b></p><br>'])
+        self.assertEqual(str(dom), markup)
+
+        dom = parse(markup, raw_depth=0)
+        self.assertEqual(dom._children, [markup])
+
+    def test_raw_depth_implied_end_tags(self):
+        markup = "<ul><li>a<li>b</ul><p>x</p>"
+        dom = parse(markup, raw_depth=1)
+
+        self.assertEqual(str(dom), markup)
+        self.assertEqual([c._tag for c in dom._children], ["ul", "p"])
+        self.assertEqual(dom._children[0]._children, ["<li>a<li>b"])
+
+        markup = "<div><p><span>x</b></span>y</div>"
+        dom = parse(markup, raw_depth=1)
+        self.assertEqual(dom._children[0]._children, ["<p><span>x</b></span>y"])
+
+    def test_feed(self):
+        builder = TreeBuilder()
+        for chunk in ["<div><sp", "an>hi</span", "></div>"]:
+            builder.feed(chunk)
+        dom = builder.finish()
+
+        self.assertEqual(str(dom), str(div(HtmlElement("span", "hi"))))
+
+    def test_iterparse(self):
+        chunks = ["<p>one</p><p>t", "wo</p>", "tail"]
+        nodes = list(iterparse(chunks))
+        self.assertEqual([str(n) for n in nodes], ["<p>one</p>", "<p>two</p>", "tail"])
+
+        nodes = list(iterparse(io.StringIO("<p>a</p>" * 10), chunk_size=3))
+        self.assertEqual(len(nodes), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
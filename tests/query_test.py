@@ -0,0 +1,151 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import unittest
+import weakref
+from unittest import mock
+
+from htbuilder import a, div, fragment, li, nav, p, span, ul
+from htbuilder.query import Index, index, select, select_one
+
+
+def _tree():
+    return div(id="main", _class="page")(
+        nav(_class="menu top")(
+            a(href="/", _class="active")("Home"),
+            a(href="/about")("About"),
+            fragment(a(data_kind="external")("Elsewhere")),
+        ),
+        ul(li(_class="item")(span(i)) for i in range(3)),
+        p(a(href="/footer")("Footer")),
+    )
+
+
+class TestQuery(unittest.TestCase):
+    def test_lookups(self):
+        dom = _tree()
+        idx = Index(dom)
+
+        self.assertIs(idx.by_id("main"), dom)
+        self.assertIsNone(idx.by_id("nope"))
+        self.assertEqual(len(idx.by_tag("a")), 4)
+        self.assertEqual(len(idx.by_class("item")), 3)
+        self.assertEqual(len(idx.by_class("top")), 1)
+
+    def test_select(self):
+        dom = _tree()
+
+        self.assertEqual([str(x) for x in select(dom, "nav > a[href]")], [
+            '<a href="/" class="active">Home</a>',
+            '<a href="/about">About</a>',
+        ])
+        self.assertEqual(len(select(dom, "#main a")), 4)
+        self.assertEqual(len(select(dom, "div > a")), 0)
+        self.assertEqual(len(select(dom, "nav.menu.top > a")), 3)
+        self.assertEqual(str(select_one(dom, '[data-kind="external"]')), '<a data-kind="external">Elsewhere</a>')
+        self.assertEqual(len(select(dom, "[href='/about'], li span, #main")), 5)
+        self.assertEqual(len(select(dom, "*")), 14)
+        self.assertIsNone(select_one(dom, "table"))
+
+    def test_document_order(self):
+        dom = _tree()
+        found = select(dom, "span, a.active, #main")
+        self.assertEqual([x._tag for x in found], ["div", "a", "span", "span", "span"])
+
+    def test_ancestors(self):
+        dom = _tree()
+        idx = index(dom)
+        external = select_one(dom, "[data-kind]")
+
+        self.assertEqual([x._tag for x in idx.ancestors(external)], ["div", "nav"])
+        self.assertIs(idx.parent(external), idx.by_tag("nav")[0])
+
+    def test_stays_valid_under_mutation(self):
+        dom = _tree()
+        self.assertEqual(len(select(dom, "a")), 4)
+
+        menu = select_one(dom, "nav")
+        menu(a(href="/new", id="new"))
+        self.assertEqual(len(select(dom, "a")), 5)
+        self.assertIsNotNone(select_one(dom, "#new"))
+
+        item = select_one(dom, "li")
+        item(_class="item special")
+        self.assertEqual(len(select(dom, ".special")), 1)
+
+        item.title = "hello"
+        self.assertEqual(len(select(dom, "li[title=hello]")), 1)
+
+        del item.title
+        self.assertEqual(len(select(dom, "li[title]")), 0)
+
+        fragment_child = dom._children[0]._children[2]
+        fragment_child(a(id="from-fragment"))
+        self.assertIsNotNone(select_one(dom, "#from-fragment"))
+
+    def test_updates_only_what_changed(self):
+        dom = _tree()
+        idx = index(dom)
+        self.assertEqual(len(idx.select("a")), 4)
+
+        new_link = a(id="new")
+        with mock.patch.object(idx, "_add", wraps=idx._add) as add:
+            select_one(dom, "nav")(new_link)
+            select_one(dom, "li")(title="changed")
+            self.assertEqual(len(idx.select("a")), 5)
+            self.assertEqual(len(idx.select("[title=changed]")), 1)
+
+        self.assertEqual(add.call_count, 1)
+        self.assertIs(add.call_args[0][0], new_link)
+        self.assertEqual(idx.select("#main > nav > a")[-1], new_link)
+
+        # Removed elements are forgotten.
+        nav_element = select_one(dom, "nav")
+        nav_element._children[:] = nav_element._children[:1]
+        nav_element(_class="menu")
+        self.assertEqual(len(idx.select("a")), 2)
+        self.assertIsNone(idx.by_id("new"))
+        self.assertEqual(idx.by_class("top"), [])
+
+    def test_repeated_elements(self):
+        shared = span(id="shared")
+        dom = div(p(shared), p(shared))
+        self.assertIs(select_one(dom, "#shared"), shared)
+
+        dom._children[0]._children[:] = []
+        dom._children[0](id="first")
+        self.assertIs(select_one(dom, "p > #shared"), shared)
+
+    def test_cached_index(self):
+        dom = _tree()
+        self.assertIs(index(dom), index(dom))
+
+    def test_index_is_freed_with_tree(self):
+        dom = _tree()
+        select(dom, "#main")
+        ref = weakref.ref(dom)
+
+        del dom
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_bad_selectors(self):
+        for selector in ("", "a >", "> a", "a[href", "a:hover", "a,,b"):
+            with self.assertRaises(ValueError):
+                select(_tree(), selector)
+
+
+if __name__ == "__main__":
+    unittest.main()
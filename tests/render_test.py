@@ -0,0 +1,193 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import time
+import unittest
+import zlib
+
+from htbuilder import br, div, fragment, img, li, span, ul
+from htbuilder.render import (
+    ChunkedWriter,
+    RenderLimitExceeded,
+    iter_render,
+    render,
+    render_to_file,
+)
+
+
+def _tree():
+    return div(id="container")(
+        ul(_class="list")(li(f"Item {i} ✓") for i in range(2000)),
+        img(src="foo.png"),
+        fragment("plain ", span("text"), br()),
+        42,
+    )
+
+
+class _CountingFile(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+        self.flushes = 0
+
+    def write(self, data):
+        self.writes.append(len(data))
+        return super().write(data)
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestRender(unittest.TestCase):
+    def test_iter_render(self):
+        tree = _tree()
+        self.assertEqual("".join(iter_render(tree)), str(tree))
+        self.assertEqual("".join(iter_render("text")), "text")
+        self.assertEqual("".join(iter_render(fragment())), "")
+
+    def test_deep_tree(self):
+        tree = inner = div()
+        for _ in range(5000):
+            child = div()
+            inner(child)
+            inner = child
+
+        self.assertEqual("".join(iter_render(tree)), "<div>" * 5001 + "</div>" * 5001)
+
+    def test_buffer_bounds_writes(self):
+        tree = ul(li(f"Item {i}") for i in range(2000))
+        fp = _CountingFile()
+
+        size = render_to_file(tree, fp, buffer_size=1000)
+
+        self.assertEqual(fp.getvalue().decode(), str(tree))
+        self.assertEqual(size, len(fp.getvalue()))
+        self.assertGreater(len(fp.writes), 10)
+        # Never more than one buffer plus the chunk that overflowed it.
+        self.assertLess(max(fp.writes), 1100)
+
+    def test_flush_interval(self):
+        fp = _CountingFile()
+        render_to_file(_tree(), fp, buffer_size=1000, flush_interval=10000)
+        self.assertGreater(fp.flushes, 1)
+
+        fp = _CountingFile()
+        render_to_file(_tree(), fp, buffer_size=1000)
+        self.assertEqual(fp.flushes, 1)
+
+    def test_compression(self):
+        tree = _tree()
+
+        fp = io.BytesIO()
+        render_to_file(tree, fp, buffer_size=500, compression="gzip")
+        self.assertEqual(gzip.decompress(fp.getvalue()).decode(), str(tree))
+
+        fp = io.BytesIO()
+        render_to_file(tree, fp, compression="zlib", compresslevel=9)
+        self.assertEqual(zlib.decompress(fp.getvalue()).decode(), str(tree))
+
+        with self.assertRaises(ValueError):
+            ChunkedWriter(io.BytesIO(), compression="brotli")
+
+    def test_digest(self):
+        tree = _tree()
+        expected = hashlib.sha256(str(tree).encode()).hexdigest()
+
+        digest = hashlib.sha256()
+        self.assertEqual("".join(iter_render(tree, digest=digest)), str(tree))
+        self.assertEqual(digest.hexdigest(), expected)
+
+        digest = hashlib.sha256()
+        render(tree, max_nodes=10**6, digest=digest)
+        self.assertEqual(digest.hexdigest(), expected)
+
+        # Hashes what's written, before compression.
+        digest = hashlib.sha256()
+        render_to_file(tree, io.BytesIO(), compression="gzip", buffer_size=100, digest=digest)
+        self.assertEqual(digest.hexdigest(), expected)
+
+    def test_path(self):
+        tree = _tree()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.html")
+            render_to_file(tree, path)
+
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), str(tree))
+
+
+class TestRenderLimits(unittest.TestCase):
+    def test_under_limits(self):
+        tree = _tree()
+        limits = dict(max_nodes=10000, max_chars=10**6, max_depth=3, max_time=10)
+        self.assertEqual(render(tree, **limits), str(tree))
+
+    def test_max_nodes(self):
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            render(_tree(), max_nodes=100)
+
+        self.assertEqual(cm.exception.limit, "max_nodes")
+        self.assertEqual(cm.exception.value, 100)
+
+    def test_max_chars(self):
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            render(_tree(), max_chars=500)
+        self.assertEqual(cm.exception.limit, "max_chars")
+
+        out = render(_tree(), max_chars=500, truncate="<!--cut-->")
+        body = out[: out.index("<!--cut-->")]
+        self.assertLessEqual(len(body), 500)
+        self.assertTrue(str(_tree()).startswith(body))
+        self.assertTrue(out.endswith("<li><!--cut--></li></ul></div>"))
+
+    def test_max_depth(self):
+        tree = div(div(fragment(div(div("deep")))))
+        self.assertEqual(render(tree, max_depth=4), str(tree))
+
+        with self.assertRaises(RenderLimitExceeded):
+            render(tree, max_depth=3)
+
+        self.assertEqual(
+            render(tree, max_depth=2, truncate="..."), "<div><div>...</div></div>"
+        )
+
+    def test_max_time(self):
+        tree = ul([li(i) for i in range(20000)])
+        with self.assertRaises(RenderLimitExceeded) as cm:
+            for _ in iter_render(tree, max_time=0.01):
+                time.sleep(0.001)
+        self.assertEqual(cm.exception.limit, "max_time")
+
+    def test_render_to_file(self):
+        out = io.BytesIO()
+        with self.assertRaises(RenderLimitExceeded):
+            render_to_file(_tree(), out, max_nodes=50, buffer_size=10)
+
+        # What was rendered before the limit still made it out.
+        self.assertTrue(str(_tree()).startswith(out.getvalue().decode()))
+        self.assertGreater(len(out.getvalue()), 0)
+
+        out = io.BytesIO()
+        render_to_file(_tree(), out, max_nodes=50, truncate="<!--cut-->")
+        self.assertTrue(out.getvalue().endswith(b"</li><!--cut--></ul></div>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
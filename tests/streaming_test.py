@@ -0,0 +1,165 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import itertools
+import unittest
+from concurrent.futures import Future
+
+from htbuilder import div, p, span
+from htbuilder.streaming import Deferred, astream, stream
+
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class TestStreaming(unittest.TestCase):
+    def test_placeholders_first(self):
+        slow = Future()
+        chunks = stream(div(span("fast"), Deferred(slow, fallback=p("Loading..."))))
+
+        head = []
+        for chunk in chunks:
+            head.append(chunk)
+            if chunk == "</div>":
+                break
+
+        # The whole page went out before the slow part was ready.
+        self.assertEqual(
+            "".join(head),
+            '<div><span>fast</span><htb-slot id="htb-s0"><p>Loading...</p></htb-slot></div>',
+        )
+
+        slow.set_result(span("slow"))
+        tail = "".join(chunks)
+
+        self.assertIn("function htbSwap(i)", tail)
+        self.assertTrue(
+            tail.endswith(
+                '<template id="htb-t0"><span>slow</span></template>'
+                "<script>htbSwap(0)</script>"
+            )
+        )
+
+    def test_completion_order(self):
+        first, second = Future(), Future()
+        chunks = stream(div(Deferred(first), Deferred(second)))
+        self.assertEqual("".join(itertools.islice(chunks, 6)).count("htb-slot"), 4)
+
+        second.set_result("B")
+        out = ""
+        while "htbSwap(1)" not in out:
+            out += next(chunks)
+        first.set_result("A")
+        out += "".join(chunks)
+
+        self.assertLess(out.index("htbSwap(1)</script>"), out.index("htbSwap(0)</script>"))
+
+    def test_nested_and_shared(self):
+        inner = _resolved(span("inner"))
+        outer = _resolved(div(Deferred(inner)))
+        shared = _resolved("shared")
+
+        out = "".join(stream(div(Deferred(outer), Deferred(shared), Deferred(shared))))
+
+        for slot in range(4):
+            self.assertIn(f"htbSwap({slot})", out)
+        self.assertEqual(out.count("function htbSwap"), 1)
+
+    def test_prefix_and_nonce(self):
+        out = "".join(stream(Deferred(_resolved("x")), prefix="app", nonce="abc"))
+
+        self.assertIn('<app-slot id="app-s0"></app-slot>', out)
+        self.assertIn('<script nonce="abc">appSwap(0)</script>', out)
+
+    def test_str_waits(self):
+        self.assertEqual(str(div(Deferred(_resolved(span("x"))))), "<div><span>x</span></div>")
+
+    def test_astream(self):
+        async def slow():
+            await asyncio.sleep(0.01)
+            return span("slow")
+
+        async def fast():
+            return span("fast")
+
+        async def collect():
+            page = div(Deferred(slow()), Deferred(fast()), Deferred(_resolved("f")))
+            return [chunk async for chunk in astream(page)]
+
+        out = "".join(asyncio.run(collect()))
+
+        self.assertLess(out.index("<span>fast</span>"), out.index("<span>slow</span>"))
+        self.assertIn("htbSwap(2)", out)
+
+    def test_astream_cancels_pending_tasks(self):
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.3)
+            finished.append("slow")
+            return "slow"
+
+        async def failing():
+            raise ValueError("boom")
+
+        async def fail():
+            page = div(Deferred(slow()), Deferred(failing()))
+            with self.assertRaises(ValueError):
+                async for _ in astream(page):
+                    pass
+            await asyncio.sleep(0.4)
+
+        async def disconnect():
+            chunks = astream(div(Deferred(slow())))
+            # Read up to the placeholder, so the task has been started.
+            while "</htb-slot>" not in await chunks.__anext__():
+                pass
+            await chunks.aclose()
+            await asyncio.sleep(0.4)
+
+        asyncio.run(fail())
+        asyncio.run(disconnect())
+        self.assertEqual(finished, [])
+
+    def test_digest(self):
+        page = div(span("x" * 100000), Deferred(_resolved("later")))
+
+        digest = hashlib.blake2b()
+        out = "".join(stream(page, digest=digest))
+        self.assertEqual(digest.hexdigest(), hashlib.blake2b(out.encode()).hexdigest())
+
+        async def collect():
+            return "".join([chunk async for chunk in astream(page, digest=digest)])
+
+        digest = hashlib.blake2b()
+        self.assertEqual(asyncio.run(collect()), out)
+        self.assertEqual(digest.hexdigest(), hashlib.blake2b(out.encode()).hexdigest())
+
+    def test_stream_rejects_awaitables(self):
+        async def coro():
+            return "x"
+
+        awaitable = coro()
+        with self.assertRaises(TypeError):
+            list(stream(Deferred(awaitable)))
+        awaitable.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
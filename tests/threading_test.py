@@ -0,0 +1,116 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import htbuilder
+from htbuilder import EMPTY_ELEMENTS, div, li, span, ul
+from htbuilder.render import iter_render
+
+NUM_THREADS = 16
+
+
+def _run_together(fn, num_threads=NUM_THREADS):
+    """Call fn(i) from many threads, released at the same moment."""
+    barrier = threading.Barrier(num_threads)
+
+    def worker(i):
+        barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(num_threads) as pool:
+        return list(pool.map(worker, range(num_threads)))
+
+
+class TestThreading(unittest.TestCase):
+    def test_shared_tree(self):
+        tree = div(id="root", data_index=0)(
+            ul(_class="list")(li(_class="item", data_n=i)(span(i)) for i in range(500))
+        )
+        expected = str(tree)
+
+        def render(i):
+            out = []
+            for _ in range(20):
+                out.append(str(tree) if i % 2 else "".join(iter_render(tree)))
+            return out
+
+        for results in _run_together(render):
+            for result in results:
+                self.assertEqual(result, expected)
+
+    def test_build_in_threads(self):
+        def build(i):
+            # Goes through the module __getattr__ and fresh attribute names.
+            tag = getattr(htbuilder, f"custom_tag_{i}")
+            return [str(tag(**{f"attr_{i}_{j}": j})) for j in range(200)]
+
+        for i, results in enumerate(_run_together(build)):
+            self.assertEqual(results[5], f'<custom-tag-{i} attr-{i}-5="5"></custom-tag-{i}>')
+
+    def test_lazy_import_race(self):
+        code = (
+            "import threading\n"
+            "import htbuilder\n"
+            "barrier = threading.Barrier(8)\n"
+            "out = []\n"
+            "def worker():\n"
+            "    barrier.wait()\n"
+            "    out.append(htbuilder.styles(color='red'))\n"
+            "threads = [threading.Thread(target=worker) for _ in range(8)]\n"
+            "[t.start() for t in threads]\n"
+            "[t.join() for t in threads]\n"
+            "assert out == ['color:red'] * 8, out\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_index_shared_tree(self):
+        from htbuilder.query import Index
+
+        tree = ul(li(_class="item")(span(i)) for i in range(200))
+
+        def build_index(i):
+            idx = Index(tree)
+            idx.select("li")
+            return idx
+
+        indexes = _run_together(build_index)
+
+        # Every index must have been registered, so they all see this.
+        tree._children[0](_class="item changed")
+        for idx in indexes:
+            self.assertEqual(len(idx.select(".changed")), 1)
+
+    def test_shared_metadata_is_immutable(self):
+        with self.assertRaises(AttributeError):
+            EMPTY_ELEMENTS.add("div")
+
+        with self.assertRaises(AttributeError):
+            htbuilder.div.foo = "bar"
+
+        with self.assertRaises(AttributeError):
+            htbuilder.div._tag = "span"
+
+        with self.assertRaises(AttributeError):
+            del htbuilder.div._tag
+
+        self.assertEqual(str(htbuilder.div()), "<div></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
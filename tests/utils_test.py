@@ -0,0 +1,84 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from htbuilder import div
+from htbuilder.utils import ClassSet, classes
+
+
+class TestClasses(unittest.TestCase):
+    def test_basic(self):
+        self.assertEqual(
+            classes("foo", "bar", baz=False, boz=True, long_name=True), "foo bar boz long-name"
+        )
+        self.assertEqual(
+            classes("foo", long_name=True, convert_underscores=False), "foo long_name"
+        )
+        self.assertEqual(classes(), "")
+
+    def test_dedupe_keeps_order(self):
+        self.assertEqual(classes("b", "a", "b", a=True, c=True), "b a c")
+        self.assertEqual(classes("x_y", "x-y"), "x-y")
+
+    def test_iterables_and_dicts(self):
+        self.assertEqual(
+            classes("a", ["b", None, "a"], ("c",), {"d": True, "e": False}, {"f_g"}),
+            "a b c d f-g",
+        )
+        self.assertEqual(classes(n for n in ["x", "y"]), "x y")
+
+    def test_skips_falsy(self):
+        is_active = False
+        self.assertEqual(classes("a", is_active and "active", None, "", []), "a")
+
+
+class TestClassSet(unittest.TestCase):
+    def test_flags(self):
+        button = ClassSet("btn", primary=False, is_disabled=False, large=True)
+
+        self.assertEqual(button(), "btn large")
+        self.assertEqual(button(primary=True), "btn primary large")
+        self.assertEqual(button(is_disabled=1, large=False), "btn is-disabled")
+        self.assertEqual(str(button), "btn large")
+
+    def test_matches_classes(self):
+        always = ("a", ["b", "a"])
+        flags = {"c_d": False, "b": False, "e": True}
+        class_set = ClassSet(*always, **flags)
+
+        for mask in range(8):
+            chosen = {name: bool(mask & (1 << i)) for i, name in enumerate(flags)}
+            self.assertEqual(class_set(**chosen), classes(*always, **chosen))
+
+    def test_cache(self):
+        class_set = ClassSet(a=False)
+        self.assertIs(class_set(a=True), class_set(a=True))
+
+    def test_unknown_flag(self):
+        with self.assertRaises(TypeError):
+            ClassSet("a", b=False)(c=True)
+
+    def test_attribute_value(self):
+        card = ClassSet("card", selected=True)
+        self.assertEqual(str(div(_class=card)), '<div class="card selected"></div>')
+        self.assertEqual(str(div(_class=card(selected=False))), '<div class="card"></div>')
+
+    def test_no_underscore_conversion(self):
+        class_set = ClassSet("a_b", c_d=True, convert_underscores=False)
+        self.assertEqual(class_set(), "a_b c_d")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+# Copyright 2020 Thiago Teixeira
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from htbuilder import body, br, div, fragment, html, span, table, tbody, td, tr
+from htbuilder.window import (
+    LazyChildren,
+    _find_ancestors,
+    child_count,
+    iter_window,
+    render_window,
+)
+
+
+def _rows(start, stop):
+    return "".join(str(tr(td(i))) for i in range(start, stop))
+
+
+class TestWindow(unittest.TestCase):
+    def test_plain_children(self):
+        rows = tbody(id="rows")(tr(td(i)) for i in range(100))
+
+        self.assertEqual(render_window(rows, 10, 13), f'<tbody id="rows">{_rows(10, 13)}</tbody>')
+        self.assertEqual(render_window(rows, -2, 1000), f'<tbody id="rows">{_rows(98, 100)}</tbody>')
+        self.assertEqual(render_window(rows, 50, 40), '<tbody id="rows"></tbody>')
+        self.assertEqual(render_window(rows, 0, 100), str(rows))
+
+    def test_ancestors(self):
+        rows = tbody(tr(td(i)) for i in range(10))
+        page = html(body(div(id="main")(fragment(table(rows)))))
+
+        self.assertEqual(
+            render_window(rows, 2, 4, root=page),
+            f'<html><body><div id="main"><table><tbody>{_rows(2, 4)}</tbody></table></div></body></html>',
+        )
+        self.assertEqual(render_window(page, 0, 0, root=page), "<html></html>")
+
+        with self.assertRaises(ValueError):
+            render_window(tbody(), 0, 1, root=page)
+
+    def test_ancestor_search(self):
+        class NoIter(list):
+            def __iter__(self):
+                raise AssertionError("searched inside target")
+
+        rows = tbody(tr(td(i)) for i in range(10))
+        inner = table(rows)
+        page = html(body(div(div(span("x")), "text"), div(inner)))
+        self.assertIsNone(_find_ancestors(page, tbody()))
+        rows._children = NoIter(rows._children)
+
+        page_body = page._children[0]
+        self.assertEqual(
+            _find_ancestors(page, rows), [page, page_body, page_body._children[1], inner]
+        )
+
+        # Nothing is kept on the tree.
+        self.assertIsNone(page._index)
+        self.assertIsNone(page._observers)
+
+    def test_ancestors_given(self):
+        rows = tbody(tr(td(i)) for i in range(10))
+        inner = table(rows)
+        page = html(body(inner))
+
+        self.assertEqual(
+            render_window(rows, 2, 4, ancestors=[page, page._children[0], inner]),
+            render_window(rows, 2, 4, root=page),
+        )
+        self.assertEqual(render_window(rows, 2, 4, ancestors=[]), render_window(rows, 2, 4))
+
+        with self.assertRaises(TypeError):
+            render_window(rows, 2, 4, root=page, ancestors=[page])
+
+    def test_fragments(self):
+        rows = tbody(
+            fragment(tr(td(0)), fragment(tr(td(1)), tr(td(2)))),
+            fragment(),
+            tr(td(3)),
+            fragment(tr(td(i)) for i in range(4, 10)),
+        )
+
+        self.assertEqual(child_count(rows), 10)
+        for start in range(11):
+            for stop in range(start, 11):
+                self.assertEqual(
+                    render_window(rows, start, stop), f"<tbody>{_rows(start, stop)}</tbody>"
+                )
+
+    def test_lazy_children(self):
+        built = []
+
+        def row(i):
+            built.append(i)
+            return tr(td(i))
+
+        rows = tbody(tr(td(0)), LazyChildren(row, 10**9))
+
+        self.assertEqual(child_count(rows), 10**9 + 1)
+        self.assertEqual(render_window(rows, 500, 503), f"<tbody>{_rows(499, 502)}</tbody>")
+        self.assertEqual(built, [499, 500, 501])
+
+        small = tbody(LazyChildren(lambda i: tr(td(i)), 3))
+        self.assertEqual(str(small), f"<tbody>{_rows(0, 3)}</tbody>")
+
+        lazy = LazyChildren(lambda i: i * 2, 5)
+        self.assertEqual((len(lazy), lazy[2], lazy[-1]), (5, 4, 8))
+        with self.assertRaises(IndexError):
+            lazy[5]
+
+    def test_changes(self):
+        inner = fragment(tr(td(1)))
+        outer = fragment(tr(td(0)), inner)
+        rows = tbody(outer)
+        self.assertEqual(child_count(rows), 2)
+
+        inner(tr(td(2)))
+        self.assertEqual(child_count(rows), 3)
+        self.assertEqual(render_window(rows, 1, 3), f"<tbody>{_rows(1, 3)}</tbody>")
+
+        rows(tr(td(3)))
+        self.assertEqual(render_window(rows, 2, 4), f"<tbody>{_rows(2, 4)}</tbody>")
+
+    def test_bad_target(self):
+        with self.assertRaises(TypeError):
+            list(iter_window(br(), 0, 1))
+        with self.assertRaises(TypeError):
+            list(iter_window(fragment(), 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()